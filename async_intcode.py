@@ -0,0 +1,34 @@
+"""
+Intcode computers running as asyncio tasks.
+"""
+
+import asyncio
+from typing import Optional
+
+from intcode import Intcode
+
+
+class AsyncIntcode:
+    """An Intcode computer reading its input from the INBOX queue and publishing its output to the OUTBOX queue.
+    It gives control back to the event loop every SLICE_SIZE instructions and whenever it waits for input, so that
+    many computers can share one event loop. The underlying COMPUTER keeps its synchronous API."""
+
+    def __init__(self, program, engine=Intcode, inbox: Optional[asyncio.Queue] = None,
+                 outbox: Optional[asyncio.Queue] = None, slice_size=10_000):
+        self.computer = engine(program)
+        self.inbox = asyncio.Queue() if inbox is None else inbox
+        self.outbox = asyncio.Queue() if outbox is None else outbox
+        self.slice_size = slice_size
+
+    async def run(self):
+        """Run until the program halts."""
+        computer = self.computer
+        while not computer.halted:
+            for value in computer.run_until_input_needed(self.slice_size):
+                await self.outbox.put(value)
+            if computer.state == Intcode.NEEDS_INPUT:
+                computer.append_input(await self.inbox.get())
+                while not self.inbox.empty():
+                    computer.append_input(self.inbox.get_nowait())
+            else:
+                await asyncio.sleep(0)
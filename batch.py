@@ -0,0 +1,138 @@
+"""
+Many copies of one Intcode program running in lock-step on NumPy arrays.
+"""
+
+import itertools
+from typing import Iterable, Optional, Sequence
+
+import numpy as np
+
+from intcode import Intcode, SIZE, ADD, MUL, READ, WRITE, JUMP_IF_TRUE, JUMP_IF_FALSE, LESS, EQUALS, \
+    ADJUST_REL_BASE, EXIT
+
+
+class BatchIntcode:
+    """N machines running the same PROGRAM, each with its own memory and input. Memory is a 2-D array
+    with a row per machine, so that all the machines at the same position with the same instruction there
+    execute it with a few array operations. Machines whose control flow diverges simply form separate groups.
+
+    Values are 64-bit integers, and every machine has as many cells as the one using the highest address,
+    up to MAX_SIZE: the batch suits sweeps over small programs, not programs that use far memory."""
+
+    MAX_SIZE = 1 << 16
+
+    def __init__(self, program: Sequence[int], n: int, inputs: Optional[Iterable[Iterable[int]]] = None):
+        self.memory = np.tile(np.array(program, dtype=np.int64), (n, 1))
+        self.pos = np.zeros(n, dtype=np.int64)
+        self.relative_base = np.zeros(n, dtype=np.int64)
+        self.state = np.full(n, Intcode.RUNNING, dtype=object)
+        self.inputs = [[] for _ in range(n)]
+        self.outputs = [[] for _ in range(n)]
+        if inputs is not None:
+            for row, values in zip(self.inputs, inputs):
+                row.extend(values)
+        # Index of the next input value of every machine.
+        self._next_input = np.zeros(n, dtype=np.int64)
+
+    def __len__(self):
+        return len(self.pos)
+
+    @property
+    def halted(self) -> bool:
+        return bool((self.state == Intcode.HALTED).all())
+
+    def run(self) -> list:
+        """Run until every machine halts or needs input, and return the list of outputs of each machine.
+        Machines that needed input try again, so new values can be appended to INPUTS in between."""
+        self.state[self.state == Intcode.NEEDS_INPUT] = Intcode.RUNNING
+        while (running := np.flatnonzero(self.state == Intcode.RUNNING)).size:
+            positions, groups = np.unique(self.pos[running], return_inverse=True)
+            for k, pos in enumerate(positions):
+                machines = running[groups == k]
+                words = self.memory[machines, pos]
+                for word in np.unique(words):
+                    self._step(machines[words == word], int(pos), int(word))
+        return self.outputs
+
+    def _address(self, machines, mode: int, param):
+        """Addresses given by a parameter in mode 0 or 2. Grows, and so replaces, MEMORY if needed to hold them."""
+        address = param + self.relative_base[machines] if mode == 2 else param
+        if address.min() < 0:
+            raise IndexError(f'Negative address {address.min()}')
+        top = int(address.max())
+        if top >= self.memory.shape[1]:
+            if top >= BatchIntcode.MAX_SIZE:
+                raise IndexError(f'Address {top} is beyond the batch memory size {BatchIntcode.MAX_SIZE}')
+            grown = min(max(2 * self.memory.shape[1], top + 1), BatchIntcode.MAX_SIZE)
+            self.memory = np.pad(self.memory, ((0, 0), (0, grown - self.memory.shape[1])))
+        return address
+
+    def _value(self, machines, mode: int, param):
+        if mode == 1:
+            return param
+        address = self._address(machines, mode, param)
+        return self.memory[machines, address]
+
+    def _step(self, machines, pos: int, word: int):
+        """Execute the instruction WORD at POS on MACHINES."""
+        op = word % 100
+        if op not in SIZE:
+            raise ValueError(f'Unexpected code {word} at position {pos}.')
+        modes = [word // 10 ** i % 10 for i in (2, 3, 4)]
+        if any(mode > 2 for mode in modes):
+            raise ValueError(f'Unexpected mode in {word} at position {pos}.')
+        size = SIZE[op]
+        self._address(machines, 0, np.int64(pos + size - 1))
+        params = [self.memory[machines, pos + i] for i in range(1, size)]
+
+        if op == EXIT:
+            self.state[machines] = Intcode.HALTED
+            return
+        if op == READ:
+            waiting = self._next_input[machines] >= np.array([len(self.inputs[i]) for i in machines])
+            self.state[machines[waiting]] = Intcode.NEEDS_INPUT
+            machines, param = machines[~waiting], params[0][~waiting]
+            if machines.size:
+                values = np.array([self.inputs[i][j] for i, j in zip(machines, self._next_input[machines])])
+                address = self._address(machines, modes[0], param)
+                self.memory[machines, address] = values
+                self._next_input[machines] += 1
+                self.pos[machines] += size
+            return
+
+        x = self._value(machines, modes[0], params[0])
+        if op in (ADD, MUL, LESS, EQUALS):
+            y = self._value(machines, modes[1], params[1])
+            if op == ADD:
+                value = x + y
+            elif op == MUL:
+                value = x * y
+            elif op == LESS:
+                value = (x < y).astype(np.int64)
+            else:
+                value = (x == y).astype(np.int64)
+            address = self._address(machines, modes[2], params[2])
+            self.memory[machines, address] = value
+        elif op == JUMP_IF_TRUE or op == JUMP_IF_FALSE:
+            taken = (x != 0) if op == JUMP_IF_TRUE else (x == 0)
+            self.pos[machines] = np.where(taken, self._value(machines, modes[1], params[1]), pos + size)
+            return
+        elif op == WRITE:
+            for i, value in zip(machines, x):
+                self.outputs[i].append(int(value))
+        elif op == ADJUST_REL_BASE:
+            self.relative_base[machines] += x
+        self.pos[machines] += size
+
+
+def run_grid(program: Sequence[int], overrides: dict, inp: Iterable[int] = ()) -> tuple:
+    """Run PROGRAM with INP for every combination of values in OVERRIDES, which maps addresses to the values
+    to put there, as a single batch. Returns the combinations as an array with a column per address,
+    in the order of itertools.product, and the batch after the run."""
+    addresses = list(overrides)
+    combinations = np.array(list(itertools.product(*(overrides[a] for a in addresses))), dtype=np.int64)
+    inp = list(inp)
+    batch = BatchIntcode(program, len(combinations), itertools.repeat(inp, len(combinations)))
+    batch.memory[:, addresses] = combinations
+    batch.run()
+    return combinations, batch
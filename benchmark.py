@@ -0,0 +1,175 @@
+"""
+Benchmarks of the Intcode engines on the real puzzle inputs.
+
+Every workload runs in a fresh process, once for timing and once more under tracemalloc, and the results
+are appended to a JSON history file so that the effect of a change on throughput can be compared with
+earlier runs:
+
+    python benchmark.py [--history FILE] [--label LABEL] [--repeat N] [WORKLOAD ...]
+"""
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import resource
+import subprocess
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from day7 import Amplifiers, FeedbackAmplifiers
+from day11 import RobotWithProgram
+from day13 import Arcade, Autopilot
+from intcode import Intcode, load_program
+from jit import CompiledIntcode
+from parallel import sweep
+
+ENGINES = {'interpreter': Intcode, 'compiled': CompiledIntcode}
+
+
+def produces(target, comp: Intcode) -> bool:
+    return comp.memory[0] == target
+
+
+def day2(engine):
+    program = load_program('inputs/day2.txt')
+    assert sweep(program, {1: range(100), 2: range(100)}, partial(produces, 19690720), workers=1,
+                 engine=engine) == {1: 23, 2: 47}
+
+
+def day5(engine):
+    comp = engine(load_program('inputs/day5.txt'))
+    assert comp.run([1])[-1] == 13787043
+    assert comp.run([5]) == [3892695]
+
+
+def day7(engine):
+    program = load_program('inputs/day7.txt')
+    assert Amplifiers(program, engine=engine).find_best_phase()[1] == 77500
+    assert FeedbackAmplifiers(program, engine=engine).find_best_phase(range(5, 10))[1] == 22476942
+
+
+def day9(engine):
+    assert engine(load_program('inputs/day9.txt')).run([2]) == [34738]
+
+
+def day11(engine):
+    robot = RobotWithProgram('inputs/day11.txt', engine=engine)
+    robot.paint()
+    assert robot.painted_panels == 2594
+
+
+def day13(engine):
+    arcade = Arcade('inputs/day13.txt', quarters=2, engine=engine)
+    while not arcade.brain.halted:
+        arcade.draw()
+    assert arcade.score == 19297
+
+
+def autopilot(engine):
+    """The game of day13 played by the autopilot instead of chasing the ball, to compare the instructions."""
+    assert Autopilot('inputs/day13.txt', quarters=2, engine=engine).play() == 19297
+
+
+WORKLOADS = {'day2': day2, 'day5': day5, 'day7': day7, 'day9': day9, 'day11': day11, 'day13': day13,
+             'autopilot': autopilot}
+
+
+def counting(engine) -> tuple:
+    """Return a subclass of ENGINE that keeps track of its instances, and the list they are added to."""
+    machines = []
+
+    class Counting(engine):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            machines.append(self)
+
+    return Counting, machines
+
+
+def measure(workload: str, engine: str) -> dict:
+    """Run WORKLOAD with ENGINE in this process and return its statistics. Meant to run in a fresh process,
+    so that the peak RSS is the workload's own."""
+    cls, machines = counting(ENGINES[engine])
+    start = time.perf_counter()
+    WORKLOADS[workload](cls)
+    wall = time.perf_counter() - start
+    instructions = sum(machine.instructions for machine in machines)
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+    tracemalloc.start()
+    WORKLOADS[workload](ENGINES[engine])
+    _, traced_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        'workload': workload,
+        'engine': engine,
+        'wall': wall,
+        'instructions': instructions,
+        'instructions_per_second': instructions / wall,
+        'peak_rss': peak_rss,
+        'traced_peak': traced_peak,
+    }
+
+
+def isolated(workload: str, engine: str) -> dict:
+    with ProcessPoolExecutor(1) as pool:
+        return pool.submit(measure, workload, engine).result()
+
+
+def revision() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def benchmark(workloads=tuple(WORKLOADS), engines=tuple(ENGINES), repeat=1) -> list:
+    """Measure every combination of WORKLOADS and ENGINES, keeping the fastest of REPEAT runs of each."""
+    return [min((isolated(workload, engine) for _ in range(repeat)), key=lambda result: result['wall'])
+            for workload in workloads for engine in engines]
+
+
+def record(history: str, results: list, label: str = ''):
+    """Append RESULTS to the JSON list stored in HISTORY, creating it if needed."""
+    runs = []
+    if os.path.exists(history):
+        with open(history) as f:
+            runs = json.load(f)
+    runs.append({
+        'date': datetime.datetime.now().isoformat(timespec='seconds'),
+        'revision': revision(),
+        'label': label,
+        'python': platform.python_version(),
+        'results': results,
+    })
+    with open(history, 'w') as f:
+        json.dump(runs, f, indent=1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the Intcode engines.')
+    parser.add_argument('workloads', nargs='*', metavar='WORKLOAD', help=', '.join(WORKLOADS))
+    parser.add_argument('--engine', action='append', choices=list(ENGINES), dest='engines')
+    parser.add_argument('--repeat', type=int, default=1)
+    parser.add_argument('--history', default='benchmarks.json')
+    parser.add_argument('--label', default='')
+    args = parser.parse_args()
+    if unknown := set(args.workloads) - set(WORKLOADS):
+        parser.error(f'unknown workloads: {", ".join(sorted(unknown))}')
+    results = benchmark(args.workloads or list(WORKLOADS), args.engines or list(ENGINES), args.repeat)
+    print(f'{"workload":10}{"engine":14}{"wall (s)":>10}{"instructions":>14}{"instr/s":>12}'
+          f'{"peak RSS MB":>13}{"traced MB":>11}')
+    for r in results:
+        print(f'{r["workload"]:10}{r["engine"]:14}{r["wall"]:10.3f}{r["instructions"]:14,}'
+              f'{r["instructions_per_second"]:12,.0f}{r["peak_rss"] / 2 ** 20:13.1f}'
+              f'{r["traced_peak"] / 2 ** 20:11.1f}')
+    record(args.history, results, args.label)
+
+
+if __name__ == '__main__':
+    main()
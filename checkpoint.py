@@ -0,0 +1,90 @@
+"""
+Checkpoints of Intcode computers on disk.
+
+A checkpoint is a 64-byte header followed by packed 64-bit integers in the machine's byte order: the program,
+the dense prefix of memory, the (address, value) pairs of the cells beyond it, and the queued input. Resuming maps
+the file into memory instead of reading it, so a large memory is only loaded as far as it is used, and
+any number of processes can resume from the same checkpoint without running the warm-up again.
+"""
+
+import copy
+import os
+import struct
+from array import array
+from typing import Optional
+
+from intcode import Intcode, Snapshot
+from memory import MappedMemory, PAGE_BITS
+
+MAGIC = b'INTCODE1'
+# Magic, then pos, relative base, state, and the number of program cells, dense cells, other cells and inputs.
+HEADER = struct.Struct('=8s7q')
+STATES = (Intcode.RUNNING, Intcode.NEEDS_INPUT, Intcode.HALTED, Intcode.SUSPENDED)
+
+
+def _packed(values) -> bytes:
+    return array('q', values).tobytes()
+
+
+def save(computer: Intcode, path: str):
+    """Write the state of COMPUTER to PATH, replacing the file at once so that a crash leaves the previous
+    checkpoint intact. Input fed as iterables that have not been read yet, and INPUT_FN, are not saved."""
+    if computer._sources:
+        raise ValueError('Cannot save a computer with input iterables that have not been consumed')
+    memory = computer._memory
+    cells = sorted(item for page in memory.pages.values() for item in page.items())
+    data = [
+        HEADER.pack(MAGIC, computer.pos, computer.relative_base, STATES.index(computer.state),
+                    len(memory.program), len(memory.dense), len(cells), len(computer._input)),
+        _packed(memory.program),
+        _packed(memory.dense),
+        _packed(x for cell in cells for x in cell),
+        _packed(computer._input),
+    ]
+    with open(path + '.tmp', 'wb') as f:
+        f.writelines(data)
+    os.replace(path + '.tmp', path)
+
+
+def load(path: str) -> Snapshot:
+    """Read the checkpoint at PATH. Its memory is a MappedMemory backed by the file."""
+    with open(path, 'rb') as f:
+        header = f.read(HEADER.size)
+        if len(header) < HEADER.size or header[:len(MAGIC)] != MAGIC:
+            raise ValueError(f'{path} is not an Intcode checkpoint')
+        _, pos, relative_base, state, program, dense, cells, inputs = HEADER.unpack(header)
+        f.seek(HEADER.size + 8 * (program + dense))
+        rest = array('q')
+        rest.frombytes(f.read(8 * (2 * cells + inputs)))
+    start = HEADER.size + 8 * program
+    pages = {}
+    for address, value in zip(rest[:2 * cells:2], rest[1:2 * cells:2]):
+        pages.setdefault(address >> PAGE_BITS, {})[address] = value
+    memory = MappedMemory(path, (HEADER.size, start), (start, start + 8 * dense), pages)
+    return Snapshot(memory=memory, pos=pos, relative_base=relative_base, state=STATES[state],
+                    input=tuple(rest[2 * cells:]), sources=[])
+
+
+def resume(path: str, engine=Intcode) -> Intcode:
+    """Return a computer of type ENGINE continuing from the checkpoint at PATH."""
+    snapshot = load(path)
+    # The computer starts out on a shallow copy of the mapped memory, whose reset only rebinds its own
+    # attributes: the program is neither copied nor read, and the snapshot's memory is left as it is.
+    computer = engine(snapshot.memory.program, memory=lambda _: copy.copy(snapshot.memory))
+    computer.restore(snapshot, copy=False)
+    return computer
+
+
+def run_until_input_needed(computer: Intcode, path: str, every: int, budget: Optional[int] = None) -> list:
+    """Like COMPUTER.run_until_input_needed(BUDGET), but saves a checkpoint to PATH after every EVERY
+    instructions, and when it stops."""
+    output = []
+    while True:
+        steps = every if budget is None else min(every, budget)
+        before = computer.instructions
+        output += computer.run_until_input_needed(steps)
+        save(computer, path)
+        if budget is not None:
+            budget -= computer.instructions - before
+        if computer.state != Intcode.SUSPENDED or (budget is not None and budget <= 0):
+            return output
@@ -49,7 +49,14 @@ class Point(namedtuple('Point', 'x y')):
 
     def observable(self, points: list['Point']):
         """Return number of points observable from the current one (ignoring itself)."""
-        return len({self.direction(p).norm() for p in points if self != p})
+        return len({reduced(p.x - self.x, p.y - self.y) for p in points if self != p})
+
+
+def reduced(dx: int, dy: int) -> tuple:
+    """The shortest integer vector in the direction of (DX, DY): points in the same direction from
+    a given one have the same reduced vector, exactly."""
+    g = math.gcd(dx, dy)
+    return (dx // g, dy // g) if g else (0, 0)
 
 
 def test_point_equality():
@@ -123,6 +130,8 @@ class Map:
         self.points = points
         self.monitoring = None
         self.vaporization_order = None
+        # Number of points observable from each of POINTS, once computed.
+        self._observability = None
 
     @staticmethod
     def from_str(s: str) -> 'Map':
@@ -146,12 +155,34 @@ class Map:
             s[p.y][p.x] = fn(p)
         return '\n'.join(''.join(line) for line in s)
 
+    def observability(self) -> list[int]:
+        """Number of points observable from each of POINTS. Directions are reduced to integer vectors
+        encoded as single integers, and the counts of all the points are computed once."""
+        if self._observability is None:
+            coordinates = [(p.x, p.y) for p in self.points]
+            # Reduced vectors have |dy| <= h, so dx * stride + dy is a different integer for each of them.
+            stride = 2 * self.h + 1
+            gcd = math.gcd
+            counts = []
+            for x, y in coordinates:
+                directions = set()
+                for x1, y1 in coordinates:
+                    dx, dy = x1 - x, y1 - y
+                    g = gcd(dx, dy)
+                    if g:
+                        directions.add(dx // g * stride + dy // g)
+                counts.append(len(directions))
+            self._observability = counts
+        return self._observability
+
     def print_observability(self) -> str:
-        return self.display(lambda p: str(p.observable(self.points)))
+        counts = {(p.x, p.y): count for p, count in zip(self.points, self.observability())}
+        return self.display(lambda p: str(counts[p.x, p.y]))
 
     def best_observability(self) -> (int, int, int):
-        best = max(self.points, key=lambda p: p.observable(self.points))
-        return best.x, best.y, best.observable(self.points)
+        counts = self.observability()
+        best = max(range(len(self.points)), key=counts.__getitem__)
+        return self.points[best].x, self.points[best].y, counts[best]
 
     def set_station(self, x, y):
         """Set a monitoring station at point (x, y)."""
@@ -164,7 +195,7 @@ class Map:
         """Mark everything that's going to be vaporized after the first rotation"""
         other_points = [p for p in self.points if p != self.monitoring]
         groups = group_by(other_points,
-                          key=lambda p: self.monitoring.direction(p).norm(),
+                          key=lambda p: reduced(*self.monitoring.direction(p)),
                           sort_key=lambda p: self.monitoring.direction(p))
         for key in groups:
             for i in range(len(groups[key])):
@@ -317,6 +348,15 @@ def test_vaporization():
     assert len(vapor) == 299
 
 
+def test_reduced_directions():
+    assert reduced(4, -6) == reduced(2, -3) == (2, -3)
+    assert reduced(0, -5) == (0, -1) and reduced(0, 0) == (0, 0)
+    # Directions that differ by less than the ACCURACY of float points are still told apart.
+    m = Map(20001, 2, [Point(0, 0), Point(10000, 1), Point(20000, 1)])
+    assert m.observability() == [2, 2, 2]
+    assert m.observability() is m.observability()
+
+
 def test_part1():
     assert Map.from_str(open('inputs/day10.txt').read()).best_observability()[2] == 278
 
@@ -1,69 +1,135 @@
 from intcode import Intcode
+from jit import CompiledIntcode
 
 UP, DOWN, LEFT, RIGHT = (0, 1), (0, -1), (-1, 0), (1, 0)
 
-TURN_LEFT = (UP, LEFT, DOWN, RIGHT, UP)
-TURN_RIGHT = (UP, RIGHT, DOWN, LEFT, UP)
+# Headings in clockwise order: turning right adds one to the index of a heading, turning left subtracts one.
+DIRECTIONS = (UP, RIGHT, DOWN, LEFT)
+SYMBOLS = b'^>v<'
+
+# A panel is a byte: its color, plus PAINTED once it has been painted.
+PAINTED = 2
+# Symbols of the panels, for bytes.translate.
+PANELS = bytes.maketrans(bytes((0, 1, PAINTED, PAINTED | 1)), b'.#.#')
+
+
+class Hull:
+    """The panels of a hull, one byte per panel in a bytearray holding the rectangle that starts at (LEFT, BOTTOM)
+    and is WIDTH panels wide. The rectangle always covers the painted panels with a margin of one panel, and
+    the area from (-2, -2) to (2, 2); it doubles in size when a panel is painted too close to its edge.
+    The bounds of the painted panels are kept as they are painted."""
+
+    def __init__(self):
+        self.left = self.bottom = -4
+        self.width = self.height = 8
+        self.cells = bytearray(self.width * self.height)
+        self.painted = 0
+        # Bounds of the painted panels, or None if there are none.
+        self.min_x = self.max_x = self.min_y = self.max_y = None
+
+    def __getitem__(self, pos) -> int:
+        """The color of the panel at POS."""
+        x, y = pos
+        x, y = x - self.left, y - self.bottom
+        if 0 <= x < self.width and 0 <= y < self.height:
+            return self.cells[y * self.width + x] & 1
+        return 0
+
+    def paint(self, x: int, y: int, color: int):
+        column, row = x - self.left, y - self.bottom
+        if not (0 < column < self.width - 1 and 0 < row < self.height - 1):
+            self._grow(x, y)
+            column, row = x - self.left, y - self.bottom
+        index = row * self.width + column
+        if not self.cells[index] & PAINTED:
+            self._first_paint(x, y)
+        self.cells[index] = PAINTED | color
+
+    def _first_paint(self, x: int, y: int):
+        self.painted += 1
+        if self.min_x is None:
+            self.min_x = self.max_x = x
+            self.min_y = self.max_y = y
+        else:
+            self.min_x, self.max_x = min(self.min_x, x), max(self.max_x, x)
+            self.min_y, self.max_y = min(self.min_y, y), max(self.max_y, y)
+
+    def _grow(self, x: int, y: int):
+        """Make room for a panel painted at X, Y, at least doubling the dimension that is too small."""
+        left, width = self._extend(self.left, self.width, x)
+        bottom, height = self._extend(self.bottom, self.height, y)
+        cells = bytearray(width * height)
+        offset = self.left - left
+        for row in range(self.height):
+            start = (row + self.bottom - bottom) * width + offset
+            cells[start:start + self.width] = self.cells[row * self.width:(row + 1) * self.width]
+        self.left, self.bottom, self.width, self.height, self.cells = left, bottom, width, height, cells
+
+    @staticmethod
+    def _extend(start: int, size: int, coordinate: int) -> tuple:
+        """Start and size of a range that replaces the one from START of SIZE so as to hold COORDINATE
+        with a margin of one."""
+        if coordinate - 1 < start:
+            end = start + size
+            size = max(2 * size, end - coordinate + 1)
+            return end - size, size
+        if coordinate + 1 >= start + size:
+            return start, max(2 * size, coordinate + 2 - start)
+        return start, size
+
+    def window(self) -> tuple:
+        """The area to draw: the painted panels with a margin of one, and at least from (-2, -2) to (2, 2),
+        as MIN_X, MAX_X, MIN_Y, MAX_Y."""
+        if self.min_x is None:
+            return -2, 2, -2, 2
+        return min(-2, self.min_x - 1), max(2, self.max_x + 1), min(-2, self.min_y - 1), max(2, self.max_y + 1)
+
+    def row(self, y: int, min_x: int, max_x: int) -> bytearray:
+        """The symbols of the panels from MIN_X to MAX_X on row Y, which must be in the window."""
+        start = (y - self.bottom) * self.width - self.left
+        return bytearray(self.cells[start + min_x:start + max_x + 1].translate(PANELS))
 
 
 class Robot:
     def __init__(self, /, start=(0, 0), white_panels=(), black_panels=()):
-        self.dir = UP
+        # Index of the heading in DIRECTIONS.
+        self.heading = 0
         self.x, self.y = start
-        self.colors = {}
+        self.hull = Hull()
         for p in white_panels:
-            self.colors[p] = 1
+            self.hull.paint(*p, 1)
         for p in black_panels:
-            self.colors[p] = 0
-
-    def process(self, color, turn):
-        if color == 0:
-            # Paint black
-            self.colors[(self.x, self.y)] = 0
-        else:
-            # Paint white
-            self.colors[(self.x, self.y)] = 1
+            self.hull.paint(*p, 0)
 
-        if turn == 0:
-            # Turn left
-            self.dir = TURN_LEFT[TURN_LEFT.index(self.dir) + 1]
-        else:
-            # Turn right
-            self.dir = TURN_RIGHT[TURN_RIGHT.index(self.dir) + 1]
+    @property
+    def dir(self) -> tuple:
+        return DIRECTIONS[self.heading]
 
-        x, y = self.dir
-        self.x, self.y = self.x + x, self.y + y
+    def process(self, color, turn):
+        self.hull.paint(self.x, self.y, color)
+        # Turn left (0) or right (1).
+        self.heading = heading = (self.heading + (1 if turn else -1)) & 3
+        x, y = DIRECTIONS[heading]
+        self.x += x
+        self.y += y
 
     def color(self, pos=None):
-        x, y = pos if pos else (self.x, self.y)
-        return self.colors.get((x, y), 0)
+        return self.hull[pos if pos else (self.x, self.y)]
+
+    def row(self, y: int, min_x: int, max_x: int) -> str:
+        """Row Y of the picture of the hull, from MIN_X to MAX_X, with the robot on it if it is there."""
+        row = self.hull.row(y, min_x, max_x)
+        if y == self.y and min_x <= self.x <= max_x:
+            row[self.x - min_x] = SYMBOLS[self.heading]
+        return row.decode('ascii')
 
     def __str__(self):
-        x_coords = [p[0] for p in self.colors.keys()]
-        y_coords = [p[1] for p in self.colors.keys()]
-        min_x = min(-2, min(x_coords) - 1 if x_coords else 0)
-        max_x = max(2, max(x_coords) + 1 if x_coords else 0)
-        min_y = min(-2, min(y_coords) - 1 if y_coords else 0)
-        max_y = max(2, max(y_coords) + 1 if y_coords else 0)
-
-        symbol = {UP: '^', LEFT: '<', RIGHT: '>', DOWN: 'v'}
-
-        ss = []
-        for r in range(max_y, min_y - 1, -1):
-            s = ''
-            for c in range(min_x, max_x + 1):
-                if (c, r) == (self.x, self.y):
-                    s += symbol[self.dir]
-                elif self.color((c, r)) == 0:
-                    s += '.'
-                else:
-                    s += '#'
-            ss.append(s)
-        return '\n'.join(ss)
+        min_x, max_x, min_y, max_y = self.hull.window()
+        return '\n'.join(self.row(y, min_x, max_x) for y in range(max_y, min_y - 1, -1))
 
     @property
     def painted_panels(self):
-        return len(self.colors.keys())
+        return self.hull.painted
 
 
 def test_robot():
@@ -108,24 +174,108 @@ def test_robot():
     assert r.painted_panels == 6
 
 
+def test_hull_grows():
+    hull = Hull()
+    hull.paint(0, 0, 1)
+    hull.paint(100, -50, 1)
+    hull.paint(-30, 70, 0)
+    hull.paint(100, -50, 0)
+    assert hull.painted == 3
+    assert (hull[(0, 0)], hull[(100, -50)], hull[(-30, 70)], hull[(5000, 5000)]) == (1, 0, 0, 0)
+    assert hull.window() == (-31, 101, -51, 71)
+    assert hull.left <= -31 and hull.left + hull.width > 101
+    assert hull.row(0, -2, 2) == b'..#..' and hull.row(71, -31, -29) == b'...'
+
+
 class RobotWithProgram(Robot):
-    def __init__(self, filename, /, white_panels=(), black_panels=()):
-        self.brain = Intcode.from_file(filename)
+    def __init__(self, filename, /, white_panels=(), black_panels=(), engine=Intcode):
+        self.brain = engine.from_file(filename)
         self.brain.reset()
+        # Number of panels painted by the brain so far.
+        self.steps = 0
         super().__init__(white_panels = white_panels, black_panels=black_panels)
 
-    def paint(self):
-        while True:
-            self.brain.append_input(self.color())
-            color = self.brain.run_until_output()
-            if color is None:
-                return
-            turn = self.brain.run_until_output()
-            self.process(color, turn)
+    def events(self):
+        """Yield (x, y, color, step) for every panel the brain paints, as soon as it paints it; STEP counts
+        from 0. The brain only runs as far as the events are read, so a consumer can stop at any point, and
+        reading the events again goes on from there."""
+        brain = self.brain
+        while not brain.halted:
+            if brain.state == Intcode.NEEDS_INPUT:
+                brain.append_input(self.color())
+            output = brain.run_until_outputs(2)
+            if len(output) == 2:
+                x, y = self.x, self.y
+                self.process(*output)
+                self.steps += 1
+                yield x, y, output[0], self.steps - 1
+
+    def paint(self, panels=None):
+        """Run the brain until it halts, or until PANELS panels have been painted, if given."""
+        for _ in self.events():
+            if panels is not None and self.painted_panels >= panels:
+                break
+
+
+class HullRenderer:
+    """The picture of the hull painted by ROBOT, brought up to date by UPDATE with every event of
+    ROBOT.EVENTS. Only the rows with a change since the last time it was drawn are drawn again, unless
+    the area to draw has grown since."""
+
+    def __init__(self, robot: Robot):
+        self.robot = robot
+        self.lines = {}
+        self._window = None
+        self._changed = set()
+        # Row the robot was drawn on.
+        self._robot_row = None
+
+    def update(self, event: tuple):
+        self._changed.add(event[1])
+
+    def __str__(self):
+        robot = self.robot
+        window = min_x, max_x, min_y, max_y = robot.hull.window()
+        if window != self._window:
+            self.lines = {y: robot.row(y, min_x, max_x) for y in range(min_y, max_y + 1)}
+            self._window = window
+        else:
+            for y in self._changed | {self._robot_row, robot.y}:
+                if min_y <= y <= max_y:
+                    self.lines[y] = robot.row(y, min_x, max_x)
+        self._changed.clear()
+        self._robot_row = robot.y
+        return '\n'.join(self.lines[y] for y in range(max_y, min_y - 1, -1))
 
 
 def test_part1():
+    for engine in (Intcode, CompiledIntcode):
+        r = RobotWithProgram('inputs/day11.txt', engine=engine)
+        r.paint()
+        assert r.painted_panels == 2594
+
+
+def test_events():
+    r = RobotWithProgram('inputs/day11.txt')
+    renderer = HullRenderer(r)
+    for event in r.events():
+        renderer.update(event)
+        x, y, color, step = event
+        assert r.color((x, y)) == color
+        if step % 200 == 0:
+            assert str(renderer) == str(r)
+        if r.painted_panels == 1000:
+            break
+    assert step + 1 == r.steps and not r.brain.halted
+    # Reading the events again goes on where the first reader stopped.
+    events = list(r.events())
+    assert events[0][3] == step + 1 and len(events) + step + 1 == r.steps
+    assert r.painted_panels == 2594
+    assert str(renderer) == str(r)
+
     r = RobotWithProgram('inputs/day11.txt')
+    r.paint(panels=100)
+    assert r.painted_panels == 100
     r.paint()
     assert r.painted_panels == 2594
 
@@ -1,8 +1,17 @@
+import io
+import sys
+from collections import deque
+from typing import Optional
+
 from intcode import Intcode
+from jit import CompiledIntcode
 
 
 EMPTY, WALL, BLOCK, PADDLE, BALL = range(5)
 SYMBOL = {EMPTY: ' ', WALL: 'W', BLOCK: '\u2592', PADDLE: '\u2582', BALL: '\u25EF'}
+# Tables for str.translate of a row of the screen, decoded from a bytearray, for the top row and the rest.
+TOP_ROW = str.maketrans({chr(tile): symbol for tile, symbol in SYMBOL.items()} | {chr(WALL): '\u2500'})
+ROW = str.maketrans({chr(tile): symbol for tile, symbol in SYMBOL.items()} | {chr(WALL): '\u2502'})
 
 
 def sign(x):
@@ -15,8 +24,8 @@ def sign(x):
 
 
 class Arcade:
-    def __init__(self, filename, quarters=None):
-        self.brain = Intcode.from_file(filename)
+    def __init__(self, filename, quarters=None, engine=Intcode):
+        self.brain = engine.from_file(filename)
         self.brain.reset()
         if quarters is not None:
             self.brain.memory[0] = quarters
@@ -24,21 +33,25 @@ class Arcade:
         self.score = 0
         self.ball = -1
         self.paddle = -1
-        self.brain.input_fn = lambda: sign(self.ball-self.paddle)
 
     def draw(self, count=962):
-        for _ in range(count):
-            x = self.brain.run_until_output()
-            y = self.brain.run_until_output()
-            tile = self.brain.run_until_output()
-            if tile == PADDLE:
-                self.paddle = x
-            elif tile == BALL:
-                self.ball = x
-            if x == -1 and y == 0:
-                self.score = tile
-            else:
-                self.screen[(x, y)] = tile
+        while count > 0 and not self.brain.halted:
+            output = self.brain.run_until_outputs(3 * count)
+            for i in range(0, len(output), 3):
+                self.tile(*output[i:i + 3])
+            count -= len(output) // 3
+            if self.brain.state == Intcode.NEEDS_INPUT:
+                self.brain.append_input(sign(self.ball - self.paddle))
+
+    def tile(self, x, y, tile):
+        if tile == PADDLE:
+            self.paddle = x
+        elif tile == BALL:
+            self.ball = x
+        if x == -1 and y == 0:
+            self.score = tile
+        else:
+            self.screen[(x, y)] = tile
 
     def __str__(self):
         xcoord = [c[0] for c in self.screen.keys() if c[0] is not None]
@@ -69,6 +82,249 @@ class Arcade:
         return '\n'.join(result) + '\n' + str(self.score)
 
 
+def chase(arcade) -> int:
+    """Joystick position that moves the paddle towards the ball."""
+    return sign(arcade.ball - arcade.paddle)
+
+
+class HeadlessArcade:
+    """Runs the game without keeping a tile per key: the screen is a bytearray holding WIDTH cells per row, grown
+    when a tile is drawn outside it, and every frame (what the program draws before it reads the joystick again)
+    reports only the cells it changed. CONTROLLER gives the joystick position from the state of the arcade."""
+
+    def __init__(self, filename, quarters=None, engine=Intcode, controller=chase, width=48, height=32):
+        self.brain = engine.from_file(filename)
+        self.brain.reset()
+        if quarters is not None:
+            self.brain.memory[0] = quarters
+        self.controller = controller
+        self.cells = bytearray(width * height)
+        self.width = width
+        # Number of columns and rows drawn so far.
+        self.columns = self.rows = 0
+        self.blocks = 0
+        self.score = 0
+        self.ball = -1
+        self.paddle = -1
+        self.frames = 0
+
+    def frame(self) -> list:
+        """Set the joystick if the program waits for it, run until it reads the joystick again or halts,
+        and return the cells that changed as (x, y, tile) tuples."""
+        brain = self.brain
+        if brain.state == Intcode.NEEDS_INPUT:
+            brain.append_input(self.controller(self))
+        return self._draw(brain.run_until_input_needed())
+
+    def _draw(self, output: list) -> list:
+        """Draw the tiles in OUTPUT, the output of a frame, and return the cells that changed."""
+        self.frames += 1
+        cells, width, columns, rows = self.cells, self.width, self.columns, self.rows
+        changed = {}
+        values = iter(output)
+        for x, y, tile in zip(values, values, values):
+            if x < 0 or y < 0:
+                if x == -1 and y == 0:
+                    self.score = tile
+                    continue
+                raise ValueError(f'Tile {tile} drawn at ({x}, {y})')
+            if x >= columns:
+                columns = x + 1
+            if y >= rows:
+                rows = y + 1
+            if x >= width or (y + 1) * width > len(cells):
+                self.columns, self.rows = columns, rows
+                self._grow(x, y)
+                cells, width = self.cells, self.width
+            index = y * width + x
+            old = cells[index]
+            if old != tile:
+                changed.setdefault((x, y), old)
+                cells[index] = tile
+                self.blocks += (tile == BLOCK) - (old == BLOCK)
+            if tile == PADDLE:
+                self.paddle = x
+            elif tile == BALL:
+                self.ball = x
+        self.columns, self.rows = columns, rows
+        return [(x, y, tile) for (x, y), old in changed.items() if (tile := cells[y * width + x]) != old]
+
+    def _grow(self, x, y):
+        """Make room for a tile at X, Y, at least doubling the dimension that is too small."""
+        width, height = self.width, len(self.cells) // self.width
+        new_width = max(2 * width, x + 1) if x >= width else width
+        new_height = max(2 * height, y + 1) if y >= height else height
+        cells = bytearray(new_width * new_height)
+        for row in range(height):
+            cells[row * new_width:row * new_width + width] = self.cells[row * width:(row + 1) * width]
+        self.cells, self.width = cells, new_width
+
+    @property
+    def game_over(self) -> bool:
+        return self.brain.halted
+
+    def play(self, render_every=0, file=sys.stdout) -> int:
+        """Play until the game ends, and return the final score. If RENDER_EVERY is positive, the screen is
+        printed to FILE every RENDER_EVERY frames and at the end; otherwise it is never turned into text."""
+        while not self.game_over:
+            self.frame()
+            if render_every and self.frames % render_every == 0:
+                print(self, file=file)
+        if render_every and self.frames % render_every:
+            print(self, file=file)
+        return self.score
+
+    def __str__(self):
+        """Same picture as Arcade's, for a screen drawn from (0, 0)."""
+        lines = []
+        for y in range(self.rows):
+            start = y * self.width
+            line = self.cells[start:start + self.columns].decode('latin-1')
+            lines.append(line.translate(TOP_ROW if y == 0 else ROW))
+        top = lines[0] if lines else ''
+        if top.startswith('\u2500'):
+            top = '\u250C' + top[1:]
+        if top.endswith('\u2500'):
+            top = top[:-1] + '\u2510'
+        return '\n'.join([top] + lines[1:]) + '\n' + str(self.score)
+
+
+class Autopilot(HeadlessArcade):
+    """Plays ahead rather than choosing the joystick position frame by frame. When the ball leaves the paddle,
+    a model of its flight over the screen says where it comes down, the paddle is steered there, to the side
+    that sends the ball back towards a block soonest, and the program runs until the ball comes down. If the
+    ball gets past the paddle, the machine goes back to a snapshot from before, and the stretch is played again
+    with the paddle steered to where the ball actually came down. The frames played ahead are drawn one per call
+    of FRAME. MISSES counts the stretches played again, and WASTED the instructions spent on them in vain."""
+
+    def __init__(self, filename, quarters=None, engine=Intcode, width=48, height=32):
+        super().__init__(filename, quarters, engine, None, width, height)
+        self.wasted = 0
+        self.misses = 0
+        self._ahead = deque()
+        # Position of the ball after the frames played ahead, and the direction it last moved in.
+        self._ball = (-1, -1)
+        self._direction = (1, 1)
+        # States of the game at the start of stretches played ahead, to tell when it goes round in circles.
+        self._seen = set()
+
+    @property
+    def game_over(self) -> bool:
+        return self.brain.halted and not self._ahead
+
+    def frame(self) -> list:
+        if not self._ahead:
+            if self.brain.state == Intcode.NEEDS_INPUT:
+                self._play_ahead()
+            else:
+                output = self.brain.run_until_input_needed()
+                values = iter(output)
+                for x, y, tile in zip(values, values, values):
+                    if tile == BALL:
+                        self._ball = (x, y)
+                self._ahead.append(output)
+        return self._draw(self._ahead.popleft())
+
+    def _play_ahead(self):
+        row = self.cells.find(PADDLE) // self.width
+        cells = bytearray(self.cells)
+        cells[self._ball[1] * self.width + self._ball[0]] = EMPTY
+        landing = self._fly(cells, self._ball, self._direction, row)
+        # If the ball keeps coming back the same way without breaking blocks, bounce it the other way.
+        state = (self._ball, self._direction, self.paddle, self.blocks)
+        other = state in self._seen
+        self._seen.add(state)
+        snapshot = self.brain.snapshot()
+        start = self.brain.instructions
+        frames, missed = self._play(None if landing is None else self._aim(cells, *landing[:3], row, other), row)
+        if missed is not None:
+            # Steer to where the ball came down, or failing that, chase it.
+            x, dx = missed
+            for target in (x + dx if abs(x + dx - self.paddle) < abs(x - self.paddle) else x, None):
+                self.misses += 1
+                self.wasted += self.brain.instructions - start
+                self.brain.restore(snapshot)
+                start = self.brain.instructions
+                frames, missed = self._play(target, row)
+                if missed is None:
+                    break
+        self._ahead.extend(frames)
+
+    def _aim(self, cells: bytearray, x: int, dx: int, steps: int, row: int, other=False) -> int:
+        """Where to put the paddle for a ball coming down at column X in direction DX in STEPS frames, with the
+        blocks left in CELLS. Right under the ball, the ball keeps going the same way; on the corner of the paddle,
+        it bounces straight back. Of the two, the paddle goes where it can get in time, and where the ball
+        breaks a block soonest on its way back, then closest; if OTHER is true, it goes to the other one."""
+        candidates = [(x, dx), (x + dx, -dx)]
+        reachable = [c for c in candidates if abs(c[0] - self.paddle) <= steps] or candidates
+
+        def rank(candidate):
+            paddle, bounce = candidate
+            flight = self._fly(bytearray(cells), (x, row - 1), (bounce, -1), row)
+            if flight is None:
+                return True, True, 0, abs(paddle - self.paddle)
+            landing, direction, frames, broken = flight
+            catchable = min(abs(landing - paddle), abs(landing + direction - paddle)) <= frames
+            return not catchable, broken is None, broken or 0, abs(paddle - self.paddle)
+
+        reachable.sort(key=rank)
+        return reachable[-1 if other else 0][0]
+
+    def _fly(self, cells: bytearray, ball: tuple, direction: tuple, row: int) -> Optional[tuple]:
+        """Follow a ball at BALL going in DIRECTION across CELLS, the screen without the ball, until it comes down
+        to the row above ROW. It bounces off what is next to it, beside or above or below, or else off what is
+        in its way diagonally, and blocks break when hit. Returns its column and horizontal direction then,
+        the number of steps, and the step at which it first broke a block (or None); or None if the ball
+        cannot be followed."""
+        width = self.width
+        (x, y), (dx, dy) = ball, direction
+        broken = None
+        for step in range(len(cells)):
+            if dy > 0 and y >= row - 1:
+                return x, dx, step, broken
+            if not (0 < x < self.columns - 1 and 0 < y < row and dx and dy):
+                return None
+            beside, ahead, diagonal = y * width + x + dx, (y + dy) * width + x, (y + dy) * width + x + dx
+            hit = [cell for cell in (beside, ahead) if cells[cell]] or [cell for cell in (diagonal,) if cells[cell]]
+            for cell in hit:
+                if cells[cell] == BLOCK:
+                    cells[cell] = EMPTY
+                    if broken is None:
+                        broken = step
+            if beside in hit or diagonal in hit:
+                dx = -dx
+            if ahead in hit or diagonal in hit:
+                dy = -dy
+            x, y = x + dx, y + dy
+        return None
+
+    def _play(self, target: Optional[int], row: int) -> tuple:
+        """Steer the paddle towards TARGET (after the ball, if None) until the ball bounces off it on ROW,
+        or the game ends. Returns the output of every frame, and if the ball got past the paddle, its column
+        and horizontal direction just before, or None."""
+        brain, paddle, ball, direction = self.brain, self.paddle, self._ball, self._direction
+        frames = []
+        while brain.state == Intcode.NEEDS_INPUT:
+            brain.append_input(sign((ball[0] if target is None else target) - paddle))
+            output = brain.run_until_input_needed()
+            frames.append(output)
+            previous = ball
+            values = iter(output)
+            for x, y, tile in zip(values, values, values):
+                if tile == PADDLE:
+                    paddle = x
+                elif tile == BALL:
+                    ball = (x, y)
+            if ball[1] >= row:
+                return frames, (previous[0], ball[0] - previous[0])
+            if ball != previous:
+                direction = (ball[0] - previous[0], ball[1] - previous[1])
+            if ball[1] < previous[1] == row - 1:
+                break
+        self._ball, self._direction = ball, direction
+        return frames, None
+
+
 def test_part1():
     a = Arcade('inputs/day13.txt')
     a.draw()
@@ -76,14 +332,47 @@ def test_part1():
 
 
 def test_part2():
-    a = Arcade('inputs/day13.txt', 2)
-    for _ in range(30):
-        a.draw()
-    assert a.score == 19297
+    for engine in (Intcode, CompiledIntcode):
+        a = Arcade('inputs/day13.txt', 2, engine=engine)
+        while not a.brain.halted:
+            a.draw()
+        assert a.score == 19297
+
+
+def test_headless():
+    a = Arcade('inputs/day13.txt')
+    a.draw()
+    headless = HeadlessArcade('inputs/day13.txt')
+    diff = headless.frame()
+    assert headless.brain.halted and headless.blocks == 372
+    assert str(headless) == str(a)
+    assert len(diff) == len([tile for tile in a.screen.values() if tile != EMPTY])
+
+    headless = HeadlessArcade('inputs/day13.txt', 2, width=4, height=2)
+    headless.frame()
+    screen = str(headless)
+    # Once the game runs, a frame moves the ball and maybe the paddle, and breaks at most a few blocks.
+    diff = headless.frame()
+    assert 2 <= len(diff) <= 8 and all(headless.cells[y * headless.width + x] == tile for x, y, tile in diff)
+    assert str(headless) != screen
+    rendered = io.StringIO()
+    assert headless.play(render_every=1000, file=rendered) == 19297
+    assert headless.blocks == 0
+    assert rendered.getvalue().count('\u250C') == headless.frames // 1000 + 1
+    assert rendered.getvalue().endswith('\n19297\n')
+
+
+def test_autopilot():
+    for engine in (Intcode, CompiledIntcode):
+        chase = HeadlessArcade('inputs/day13.txt', 2, engine=engine)
+        assert chase.play() == 19297
+        autopilot = Autopilot('inputs/day13.txt', 2, engine=engine)
+        assert autopilot.play() == 19297
+        assert autopilot.blocks == 0 and autopilot.game_over
+        # Aiming the ball at the blocks ends the game sooner, replays of missed stretches included.
+        assert autopilot.frames < chase.frames
+        assert autopilot.wasted < autopilot.brain.instructions < chase.brain.instructions
 
 
 if __name__ == '__main__':
-    a = Arcade('inputs/day13.txt', 2)
-    for _ in range(30):
-        a.draw()
-        print(a)
+    HeadlessArcade('inputs/day13.txt', 2).play(render_every=500)
@@ -1,16 +1,17 @@
-from intcode import Intcode
-from utils import read_integers
+from functools import partial
 
-PROGRAM = read_integers('inputs/day2.txt')
+from intcode import Intcode, load_program
+from parallel import sweep
+
+PROGRAM = load_program('inputs/day2.txt')
 
 
 def run_program(noun, verb):
-    prog = PROGRAM[:]
-    prog[1] = noun
-    prog[2] = verb
-    comp = Intcode(prog)
-    comp.run()
-    return comp._memory[0]
+    comp = Intcode(PROGRAM)
+    comp.memory[1] = noun
+    comp.memory[2] = verb
+    comp.run_until_input_needed()
+    return comp.memory[0]
 
 
 def test_part1():
@@ -21,12 +22,13 @@ def test_part2():
     assert run_program(23, 47) == 19690720
 
 
+def produces(target, comp: Intcode) -> bool:
+    return comp.memory[0] == target
+
+
 def find_part_2():
-    for noun in range(100):
-        for verb in range(100):
-            if run_program(noun, verb) == 19690720:
-                print(100 * noun + verb)
-                return
+    hit = sweep(PROGRAM, {1: range(100), 2: range(100)}, partial(produces, 19690720))
+    print(100 * hit[1] + hit[2])
 
 
 if __name__ == '__main__':
@@ -1,7 +1,6 @@
-from utils import read_integers
-from intcode import Intcode
+from intcode import Intcode, load_program
 
-COMP = Intcode(read_integers('inputs/day5.txt'))
+COMP = Intcode(load_program('inputs/day5.txt'))
 
 
 def test_part1():
@@ -1,31 +1,77 @@
+import functools
 import itertools
+from array import array
+from concurrent.futures import ProcessPoolExecutor
 
-from intcode import Intcode
-from utils import read_integers
+from intcode import Intcode, load_program
+from jit import CompiledIntcode
+from network import Network
+from parallel import chunked, unordered_map
 
 
 class Amplifiers:
-    def __init__(self, program: list):
-        self.A = Intcode(program)
-        self.B = Intcode(program)
-        self.C = Intcode(program)
-        self.D = Intcode(program)
-        self.E = Intcode(program)
-
-    def run(self, phases: (list, tuple)) -> int:
-        a, b, c, d, e = phases
-        b_in, = self.A.run([a, 0])
-        c_in, = self.B.run([b, b_in])
-        d_in, = self.C.run([c, c_in])
-        e_in, = self.D.run([d, d_in])
-        out, = self.E.run([e, e_in])
+    def __init__(self, program: list, engine=Intcode, cache_size=4096):
+        self.program, self.engine = program, engine
+        # Output of one amplifier for a given phase and input signal.
+        self.stage = functools.lru_cache(maxsize=cache_size)(self._stage)
+        self.A = engine(program)
+        self.B = engine(program)
+        self.C = engine(program)
+        self.D = engine(program)
+        self.E = engine(program)
+
+    def _stage(self, phase: int, signal: int) -> int:
+        out, = self.A.run([phase, signal])
         return out
 
-    def find_best_phase(self, inputs=range(5)) -> tuple:
-        best = max([(phases, self.run(phases)) for phases in itertools.permutations(inputs)],
-                   key=lambda x: x[-1])
+    def run(self, phases: (list, tuple)) -> int:
+        signal = 0
+        for phase in phases:
+            signal = self.stage(phase, signal)
+        return signal
+
+    def search(self, inputs) -> tuple:
+        """Walk the permutations of INPUTS as a trie, running each amplifier once per trie node
+        (or not at all if STAGE has seen the same phase and signal before)."""
+        best = None
+
+        def walk(prefix: tuple, remaining: list, signal: int):
+            nonlocal best
+            if not remaining:
+                if best is None or signal > best[1]:
+                    best = prefix, signal
+            for i, phase in enumerate(remaining):
+                walk(prefix + (phase,), remaining[:i] + remaining[i + 1:], self.stage(phase, signal))
+
+        walk((), list(inputs), 0)
         return best
 
+    def find_best_phase(self, inputs=range(5), workers=1, chunk_size=64) -> tuple:
+        """Return the best phases and their signal. With more than one of WORKERS, permutations
+        are evaluated in chunks of CHUNK_SIZE by worker processes, each with its own amplifiers."""
+        if workers == 1:
+            return self.search(inputs)
+        with ProcessPoolExecutor(workers, initializer=_init_amplifiers,
+                                 initargs=(type(self), array('q', self.program), self.engine)) as pool:
+            chunks = chunked(enumerate(itertools.permutations(inputs)), chunk_size)
+            signal, _, phases = max(unordered_map(pool, _best_of, chunks, 4 * workers))
+        return phases, signal
+
+
+# Amplifiers of a worker process in Amplifiers.find_best_phase.
+_amplifiers = None
+
+
+def _init_amplifiers(cls, program, engine):
+    global _amplifiers
+    _amplifiers = cls(program, engine=engine)
+
+
+def _best_of(chunk: list) -> tuple:
+    """Return (signal, -index, phases) for the best of the numbered permutations in CHUNK,
+    so that ties go to the earliest permutation like in the serial search."""
+    return max((_amplifiers.run(phases), -i, phases) for i, phases in chunk)
+
 
 def test_find_best_phase():
     assert Amplifiers(
@@ -40,33 +86,34 @@ def test_find_best_phase():
     ).find_best_phase() == ((1, 0, 4, 3, 2), 65210)
 
 
+def test_stage_cache():
+    amp = Amplifiers([3, 15, 3, 16, 1002, 16, 10, 16, 1, 16, 15, 15, 4, 15, 99, 0, 0])
+    assert amp.find_best_phase() == ((4, 3, 2, 1, 0), 43210)
+    info = amp.stage.cache_info()
+    # The trie of 5! permutations has 325 nodes; running them one by one would take 600 amplifier runs.
+    assert info.hits + info.misses == 325
+    assert info.misses < 325
+
+
 def part1():
-    amp = Amplifiers(read_integers('inputs/day7.txt'))
+    amp = Amplifiers(load_program('inputs/day7.txt'))
     print(amp.find_best_phase())
 
 
 class FeedbackAmplifiers(Amplifiers):
+    def search(self, inputs) -> tuple:
+        return max([(phases, self.run(phases)) for phases in itertools.permutations(inputs)], key=lambda x: x[-1])
+
     def run(self, phases: (list, tuple)) -> int:
-        a, b, c, d, e = phases
-        self.A.reset([a])
-        self.B.reset([b])
-        self.C.reset([c])
-        self.D.reset([d])
-        self.E.reset([e])
-        a_in = 0
-        while True:
-            self.A.append_input(a_in)
-            b_in = self.A.run_until_output()
-            if b_in is None:
-                return a_in
-            self.B.append_input(b_in)
-            c_in = self.B.run_until_output()
-            self.C.append_input(c_in)
-            d_in = self.C.run_until_output()
-            self.D.append_input(d_in)
-            e_in = self.D.run_until_output()
-            self.E.append_input(e_in)
-            a_in = self.E.run_until_output()
+        network = Network()
+        for name, amp, phase in zip('ABCDE', (self.A, self.B, self.C, self.D, self.E), phases):
+            amp.reset([phase])
+            network.add(name, amp)
+        for source, destination in itertools.pairwise('ABCDEA'):
+            network.connect(source, destination)
+        network.send('A', 0)
+        network.run()
+        return network.last['E']
 
 
 def test_feedback_amplifiers():
@@ -79,8 +126,21 @@ def test_feedback_amplifiers():
                               ).find_best_phase(range(5, 10)) == ((9, 7, 8, 5, 6), 18216)
 
 
+def test_parallel_find_best_phase():
+    program = [3, 31, 3, 32, 1002, 32, 10, 32, 1001, 31, -2, 31, 1007, 31, 0, 33, 1002, 33, 7, 33, 1, 33, 31, 31,
+               1, 32, 31, 31, 4, 31, 99, 0, 0, 0]
+    assert Amplifiers(program).find_best_phase(workers=2, chunk_size=7) == ((1, 0, 4, 3, 2), 65210)
+    program = [3, 26, 1001, 26, -4, 26, 3, 27, 1002, 27, 2, 27, 1, 27, 26, 27, 4, 27, 1001, 28, -1, 28, 1005, 28, 6,
+               99, 0, 0, 5]
+    assert FeedbackAmplifiers(program).find_best_phase(range(5, 10), workers=2, chunk_size=7) == \
+           ((9, 8, 7, 6, 5), 139629729)
+    assert FeedbackAmplifiers([3, 26, 1001, 26, -4, 26, 3, 27, 1002, 27, 2, 27, 1, 27, 26,
+                               27, 4, 27, 1001, 28, -1, 28, 1005, 28, 6, 99, 0, 0, 5], engine=CompiledIntcode
+                              ).find_best_phase(range(5, 10)) == ((9, 8, 7, 6, 5), 139629729)
+
+
 def part2():
-    amp = FeedbackAmplifiers(read_integers('inputs/day7.txt'))
+    amp = FeedbackAmplifiers(load_program('inputs/day7.txt'))
     print(amp.find_best_phase(range(5, 10)))
 
 
@@ -1,5 +1,4 @@
-from intcode import Intcode
-from utils import read_integers
+from intcode import Intcode, load_program
 
 
 def test_relative_mode():
@@ -12,8 +11,8 @@ def test_relative_mode():
 
 
 def test_part1():
-    assert Intcode(read_integers('inputs/day9.txt')).run([1]) == [2682107844]
+    assert Intcode(load_program('inputs/day9.txt')).run([1]) == [2682107844]
 
 
 def test_part2():
-    assert Intcode(read_integers('inputs/day9.txt')).run([2]) == [34738]
+    assert Intcode(load_program('inputs/day9.txt')).run([2]) == [34738]
@@ -0,0 +1,169 @@
+"""
+Disassembler and static control-flow analysis of Intcode programs.
+
+Code is found by following the control flow from the entry points. Jumps to an address held in memory
+(like returns, which jump to an address saved on the stack) cannot be followed statically, so calls are
+recognised by the idiom compilers emit for them: an instruction storing a constant, immediately followed
+by a jump that is always taken, where the constant is the address right after the jump. That address is
+where the call returns, so it is code too. Likewise, whatever follows a return or another jump to an address
+held in memory is assumed to be code, since it usually is the next function.
+
+    python disasm.py inputs/day9.txt
+"""
+
+import sys
+from collections import namedtuple
+from typing import Iterable
+
+from intcode import decode, load_program, NAMES, SIZE, ADD, MUL, READ, JUMP_IF_TRUE, JUMP_IF_FALSE, LESS, EQUALS, \
+    EXIT
+
+# A decoded instruction: its address, opcode, and the (mode, value) pairs of its parameters.
+Instruction = namedtuple('Instruction', 'pos op params')
+# A basic block: the addresses of its instructions, and the blocks control can go to next. INDIRECT is true
+# if the block ends with a jump to an address read from memory, whose targets are unknown.
+Block = namedtuple('Block', 'start instructions successors indirect')
+
+JUMPS = (JUMP_IF_TRUE, JUMP_IF_FALSE)
+STORES = (ADD, MUL, LESS, EQUALS)
+
+
+def instruction_at(program, pos) -> Instruction:
+    op, m1, p1, m2, p2, m3, p3 = decode(program, pos)
+    return Instruction(pos, op, ((m1, p1), (m2, p2), (m3, p3))[:SIZE[op] - 1])
+
+
+def always_taken(instruction: Instruction) -> bool:
+    (mode, condition), _ = instruction.params
+    return mode == 1 and (condition != 0) == (instruction.op == JUMP_IF_TRUE)
+
+
+def never_taken(instruction: Instruction) -> bool:
+    (mode, condition), _ = instruction.params
+    return mode == 1 and (condition != 0) != (instruction.op == JUMP_IF_TRUE)
+
+
+def constant(instruction: Instruction):
+    """The value stored by INSTRUCTION if it does not depend on memory, or None."""
+    if instruction.op in STORES and all(mode == 1 for mode, _ in instruction.params[:2]):
+        (_, x), (_, y), _ = instruction.params
+        return {ADD: x + y, MUL: x * y, LESS: int(x < y), EQUALS: int(x == y)}[instruction.op]
+    return None
+
+
+def successors(instruction: Instruction, previous=None) -> list:
+    """Addresses control can statically go to after INSTRUCTION, which comes right after PREVIOUS (if known)."""
+    following = instruction.pos + SIZE[instruction.op]
+    if instruction.op == EXIT:
+        return []
+    if instruction.op not in JUMPS:
+        return [following]
+    (mode, destination) = instruction.params[1]
+    result = [] if always_taken(instruction) else [following]
+    if mode == 1 and not never_taken(instruction):
+        result.append(destination)
+    if always_taken(instruction) and previous is not None and constant(previous) == following:
+        result.append(following)
+    return result
+
+
+def disassemble(program, entries: Iterable[int] = (0,)) -> dict:
+    """Return the instructions reachable from ENTRIES, keyed by address."""
+    instructions = {}
+    pending = [(pos, None) for pos in entries]
+    while pending:
+        pos, previous = pending.pop()
+        while pos not in instructions and 0 <= pos < len(program):
+            try:
+                instruction = instructions[pos] = instruction_at(program, pos)
+            except ValueError:
+                break
+            following = successors(instruction, previous)
+            pending += [(target, None) for target in following[1:]]
+            if indirect(instruction) and always_taken(instruction):
+                pending.append((pos + SIZE[instruction.op], None))
+            if not following:
+                break
+            pos, previous = following[0], instruction
+    return instructions
+
+
+def indirect(instruction: Instruction) -> bool:
+    return instruction.op in JUMPS and instruction.params[1][0] != 1 and not never_taken(instruction)
+
+
+def basic_blocks(instructions: dict) -> dict:
+    """Split INSTRUCTIONS, as returned by DISASSEMBLE, into basic blocks keyed by their first address."""
+    previous = {}
+    for instruction in instructions.values():
+        following = instruction.pos + SIZE[instruction.op]
+        if following in instructions:
+            previous[following] = instruction
+    leaders = {pos for pos in instructions if pos not in previous}
+    for instruction in instructions.values():
+        if instruction.op in JUMPS or instruction.op == EXIT:
+            leaders.update(successors(instruction, previous.get(instruction.pos)))
+            leaders.add(instruction.pos + SIZE[instruction.op])
+    leaders &= set(instructions)
+
+    blocks = {}
+    for start in sorted(leaders):
+        pos, body = start, []
+        while True:
+            instruction = instructions[pos]
+            body.append(pos)
+            following = successors(instruction, previous.get(pos))
+            pos = instruction.pos + SIZE[instruction.op]
+            if instruction.op in JUMPS or instruction.op == EXIT or pos in leaders or pos not in instructions:
+                break
+        blocks[start] = Block(start, body, [a for a in following if a in instructions], indirect(instruction))
+    return blocks
+
+
+def data_writes(instructions: dict) -> set:
+    """Addresses written by INSTRUCTIONS in position mode. Writes in relative mode go to addresses that
+    are only known at run time, and are not included."""
+    writes = set()
+    for instruction in instructions.values():
+        if instruction.op in STORES or instruction.op == READ:
+            mode, target = instruction.params[-1]
+            if mode == 0:
+                writes.add(target)
+    return writes
+
+
+def self_modifying(instructions: dict) -> set:
+    """Addresses of the instructions that the program writes to, as far as DATA_WRITES can tell."""
+    writes = data_writes(instructions)
+    return {pos for pos, instruction in instructions.items()
+            if any(address in writes for address in range(pos, pos + SIZE[instruction.op]))}
+
+
+def operand(mode, value) -> str:
+    return (f'[{value}]', f'#{value}', f'[rb{value:+}]')[mode]
+
+
+def listing(program) -> str:
+    """Disassembly of PROGRAM, with cells that are not code shown as data, and a mark (*) on instructions
+    that the program overwrites."""
+    instructions = disassemble(program)
+    blocks = basic_blocks(instructions)
+    patched = self_modifying(instructions)
+    lines = []
+    pos = 0
+    while pos < len(program):
+        instruction = instructions.get(pos)
+        if instruction is None:
+            lines.append(f'{pos:6}    .data {program[pos]}')
+            pos += 1
+            continue
+        if pos in blocks:
+            lines.append(f'{pos:6}:')
+        operands = ', '.join(operand(*param) for param in instruction.params)
+        lines.append(f'{pos:6} {"*" if pos in patched else " "}  {NAMES[instruction.op]:16}{operands}'.rstrip())
+        pos += SIZE[instruction.op]
+    return '\n'.join(lines)
+
+
+if __name__ == '__main__':
+    print(listing(load_program(sys.argv[1])))
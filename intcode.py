@@ -2,141 +2,564 @@
 Implementation of Intcode computer.
 """
 
-from typing import Optional
+import copy
+import itertools
+import os
+import time
+from array import array
+from collections import Counter, deque, namedtuple
+from typing import IO, Iterable, Optional
 
-from utils import read_integers
+from memory import SparseMemory
 
 
-MEMORY_SIZE = 1_000_000
+EXIT = 99
+ADD = 1
+MUL = 2
+READ = 3
+WRITE = 4
+JUMP_IF_TRUE = 5
+JUMP_IF_FALSE = 6
+LESS = 7
+EQUALS = 8
+ADJUST_REL_BASE = 9
+
+# Number of memory cells taken by each instruction, including the instruction itself.
+SIZE = {
+    ADD: 4, MUL: 4, READ: 2, WRITE: 2, JUMP_IF_TRUE: 3, JUMP_IF_FALSE: 3,
+    LESS: 4, EQUALS: 4, ADJUST_REL_BASE: 2, EXIT: 1,
+}
+
+NAMES = {
+    ADD: 'ADD', MUL: 'MUL', READ: 'READ', WRITE: 'WRITE', JUMP_IF_TRUE: 'JUMP_IF_TRUE', JUMP_IF_FALSE: 'JUMP_IF_FALSE',
+    LESS: 'LESS', EQUALS: 'EQUALS', ADJUST_REL_BASE: 'ADJUST_REL_BASE', EXIT: 'EXIT',
+}
+
+
+def decode(memory, pos) -> tuple:
+    """Decode the instruction at POS into a tuple (op, mode1, param1, mode2, param2, mode3, param3).
+    Missing parameters are returned as mode 0 with value 0."""
+    instruction = memory[pos]
+    op = instruction % 100
+    if op not in SIZE:
+        raise ValueError(f'Unexpected code {instruction} at position {pos}.')
+    modes = instruction // 100
+    result = [op]
+    for i in range(1, 4):
+        mode = modes % 10
+        modes //= 10
+        if mode > 2:
+            raise ValueError(f'Unexpected mode {mode} in {instruction} at position {pos}.')
+        result += (mode, memory[pos + i]) if i < SIZE[op] else (0, 0)
+    return tuple(result)
+
+
+# Programs read by load_program, keyed by path, with the modification time of the file they came from.
+_programs = {}
+
+
+def load_program(path: str) -> memoryview:
+    """Parse the comma-separated program in the file at PATH into a read-only view of an array('q').
+    Programs are cached by path and modification time, so every caller shares one image; the view
+    rejects writes to it. A memoryview cannot be pickled: send array('q', program) to other processes."""
+    mtime = os.stat(path).st_mtime_ns
+    cached = _programs.get(path)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+    with open(path, 'rb') as f:
+        program = memoryview(array('q', map(int, f.read().split(b',')))).toreadonly()
+    _programs[path] = mtime, program
+    return program
+
+
+# Saved state of an Intcode computer. INPUT holds the queued values, SOURCES the iterables fed after them.
+Snapshot = namedtuple('Snapshot', 'memory pos relative_base state input sources')
+
+
+def split_sources(sources) -> list:
+    """Split every iterable in SOURCES in two, keeping one half in SOURCES and returning the others."""
+    pairs = [itertools.tee(source) for source in sources]
+    sources.clear()
+    sources.extend(a for a, _ in pairs)
+    return [b for _, b in pairs]
+
+
+class Profile:
+    """Statistics collected by an Intcode computer created with PROFILE=True.
+
+    Call stacks are inferred from the relative base: an instruction that raises it is taken as the prologue
+    of a function, and one that lowers it as the epilogue, which is how compiled Intcode manages its stack.
+    Time spent in READ instructions, and between stopping for input and being resumed, counts as blocked."""
+
+    def __init__(self):
+        self.ops = Counter()
+        self.addresses = Counter()
+        # Instructions executed with each call stack, a tuple of prologue addresses.
+        self.stacks = Counter()
+        self.executing = 0.0
+        self.blocked = 0.0
+        self._stack = ()
+        self._waiting_since = None
+
+    @property
+    def instructions(self) -> int:
+        return sum(self.ops.values())
+
+    @property
+    def instructions_per_second(self) -> float:
+        return self.instructions / self.executing if self.executing else 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            'instructions': self.instructions,
+            'instructions_per_second': self.instructions_per_second,
+            'executing': self.executing,
+            'blocked': self.blocked,
+            'ops': {NAMES[op]: n for op, n in self.ops.most_common()},
+            'addresses': dict(self.addresses.most_common()),
+        }
+
+    def write_folded(self, file: IO[str]):
+        """Write the call stacks in the folded format read by flamegraph.pl and speedscope,
+        weighted by the number of instructions."""
+        for stack, n in sorted(self.stacks.items()):
+            file.write(';'.join(['main'] + [f'fn_{pos}' for pos in stack]) + f' {n}\n')
 
 
 class Intcode:
     """Represents an Intcode computer"""
 
-    EXIT = 99
-    ADD = 1
-    MUL = 2
-    READ = 3
-    WRITE = 4
-    JUMP_IF_TRUE = 5
-    JUMP_IF_FALSE = 6
-    LESS = 7
-    EQUALS = 8
-    ADJUST_REL_BASE = 9
-
-    def __init__(self, program):
-        self._program = program[:]
-        self._memory = [0] * MEMORY_SIZE
+    EXIT = EXIT
+    ADD = ADD
+    MUL = MUL
+    READ = READ
+    WRITE = WRITE
+    JUMP_IF_TRUE = JUMP_IF_TRUE
+    JUMP_IF_FALSE = JUMP_IF_FALSE
+    LESS = LESS
+    EQUALS = EQUALS
+    ADJUST_REL_BASE = ADJUST_REL_BASE
+
+    # Flags added to a mode of a decoded instruction that is fused with the jump after it, see _fuse.
+    FUSED = 4
+    JUMP_IF_SET = 1
+    JUMP_ALWAYS = 8
+
+    # Values of STATE: what stopped the last run.
+    RUNNING = 'running'
+    NEEDS_INPUT = 'needs input'
+    HALTED = 'halted'
+    # The instruction budget or the deadline of the run ran out; running again continues.
+    SUSPENDED = 'suspended'
+
+    # Number of instructions run between two looks at the clock, when running until a deadline.
+    SLICE_SIZE = 10_000
+
+    def __init__(self, program, memory=SparseMemory, profile=False, tracer=None):
+        self._memory = memory(program)
         self.pos = self.relative_base = None
-        self._input = []
+        self.state = Intcode.RUNNING
+        # Number of instructions executed so far, over all runs.
+        self.instructions = 0
+        # Queued input values, followed by iterables that are consumed lazily when the values run out.
+        self._input = deque()
+        self._sources = deque()
         self._input_fn = None
+        # Decoded instructions keyed by address, and the addresses of decoded instructions
+        # covering each memory cell, used to invalidate the cache when code is overwritten.
+        self._decoded = {}
+        self._code = {}
+        # _run picks the profiling or tracing loop over the regular one only for these machines,
+        # so that they cost nothing otherwise.
+        if profile and tracer is not None:
+            raise ValueError('Cannot profile and trace the same computer')
+        self.profile = Profile() if profile else None
+        self.tracer = tracer
         self.reset()
 
-    @staticmethod
-    def from_file(filename):
-        return Intcode(read_integers(filename))
-
-    @staticmethod
-    def op_and_params(instruction):
-        op = instruction % 100
-        modes = []
-        instruction //= 100
-        while instruction > 0:
-            modes.append(instruction % 10)
-            instruction //= 10
-        return op, modes
-
-    def values(self, count, modes):
-        """Given the memory counter and params, return COUNT values according"""
-        values = []
-        for i in range(count):
-            if i >= len(modes) or modes[i] == 0:
-                values.append(self._memory[self._memory[self.pos + i + 1]])
-            elif modes[i] == 1:
-                values.append(self._memory[self.pos + i + 1])
-            elif modes[i] == 2:
-                values.append(self._memory[self._memory[self.pos + i + 1] + self.relative_base])
-            else:
-                raise ValueError
-        return values
+    @classmethod
+    def from_file(cls, filename):
+        return cls(load_program(filename))
 
-    def reset(self, inp: Optional[list] = None):
-        for i in range(len(self._program)):
-            self._memory[i] = self._program[i]
-        self._input = inp[:] if inp else []
+    def reset(self, inp: Optional[Iterable] = None):
+        """Restore the program and start over. INP is consumed lazily, without copying it."""
+        self._memory.reset()
+        self._input.clear()
+        self._sources.clear()
+        if inp:
+            self._sources.append(iter(inp))
         self.pos = 0
         self.relative_base = 0
+        self.state = Intcode.RUNNING
+        self._forget_code()
+
+    def _forget_code(self):
+        """Drop everything cached about the code in memory."""
+        self._decoded.clear()
+        self._code.clear()
+
+    def fork(self) -> 'Intcode':
+        """Return an independent copy of this computer, including its pending input. Memory is shared
+        copy-on-write, so forking is cheap. INPUT_FN is shared as well, and so are PROFILE and TRACER."""
+        clone = copy.copy(self)
+        clone._memory = self._memory.fork()
+        clone._input = deque(self._input)
+        clone._sources = deque(split_sources(self._sources))
+        clone._decoded = dict(self._decoded)
+        clone._code = dict(self._code)
+        return clone
+
+    def snapshot(self) -> Snapshot:
+        return Snapshot(memory=self._memory.fork(), pos=self.pos, relative_base=self.relative_base,
+                        state=self.state, input=tuple(self._input), sources=split_sources(self._sources))
+
+    def restore(self, snapshot: Snapshot, copy=True):
+        """Return to the state saved by SNAPSHOT. A snapshot can be restored any number of times,
+        unless COPY is false: then the computer takes over the snapshot's memory and sources as they are."""
+        self._memory = snapshot.memory.fork() if copy else snapshot.memory
+        self.pos, self.relative_base, self.state = snapshot.pos, snapshot.relative_base, snapshot.state
+        self._input = deque(snapshot.input)
+        self._sources = deque(split_sources(snapshot.sources) if copy else snapshot.sources)
+        self._forget_code()
+
+    def _decode(self, pos) -> tuple:
+        """Decode the instruction at POS and add it to the cache, fused with the jump after it if possible."""
+        instruction = decode(self._memory, pos)
+        end = pos + SIZE[instruction[0]]
+        fused = self._fuse(instruction, end)
+        if fused:
+            instruction = fused
+            end += SIZE[JUMP_IF_TRUE]
+        self._decoded[pos] = instruction
+        for address in range(pos, end):
+            if pos not in self._code.get(address, ()):
+                self._code[address] = self._code.get(address, ()) + (pos,)
+        return instruction
 
-    def run_until_output(self) -> Optional[int]:
-        """Runs Intcode on a given input, producing given output."""
-        while self._memory[self.pos] != Intcode.EXIT:
-            op, modes = Intcode.op_and_params(self._memory[self.pos])
-            if op == Intcode.ADD:
-                relative = self.relative_base if len(modes) == 3 and modes[2] == 2 else 0
-                x, y = self.values(2, modes)
-                self._memory[self._memory[self.pos + 3] + relative] = x + y
-                self.pos += 4
-            elif op == Intcode.MUL:
-                relative = self.relative_base if len(modes) == 3 and modes[2] == 2 else 0
-                x, y = self.values(2, modes)
-                self._memory[self._memory[self.pos + 3] + relative] = x * y
-                self.pos += 4
-            elif op == Intcode.READ:
-                relative = self.relative_base if modes and modes[0] == 2 else 0
-                input_value = self._input_fn() if self._input_fn else self._input.pop(0)
-                self._memory[self._memory[self.pos + 1] + relative] = input_value
-                self.pos += 2
-            elif op == Intcode.WRITE:
-                x, = self.values(1, modes)
-                self.pos += 2
-                return x
-            elif op == Intcode.JUMP_IF_TRUE:
-                x, y = self.values(2, modes)
-                if x != 0:
-                    self.pos = y
+    def _fuse(self, instruction: tuple, following: int) -> Optional[tuple]:
+        """Return INSTRUCTION combined with the jump at FOLLOWING, or None if they cannot be fused.
+
+        Two idioms are fused. An arithmetic instruction followed by a jump to a fixed address, that is taken
+        always or depending on the value just stored (loop counters, comparisons, calls), is marked by adding
+        FUSED to its target mode, plus JUMP_ALWAYS or JUMP_IF_SET. ADJUST_REL_BASE followed by a jump that
+        is always taken (returns) gets FUSED as its unused second mode. The jump itself is decoded into the
+        cache as well, and the fused instruction covers its cells, so overwriting either of them drops
+        the fused instruction. Fused instructions count as two steps, and are run as two when only one
+        step is left."""
+        op, m1, p1, m2, p2, m3, p3 = instruction
+        if op not in (ADD, MUL, LESS, EQUALS, ADJUST_REL_BASE):
+            return None
+        if self._memory[following] % 100 not in (JUMP_IF_TRUE, JUMP_IF_FALSE):
+            return None
+        try:
+            jump = self._decoded.get(following) or self._decode(following)
+        except ValueError:
+            return None
+        jump_op, condition_mode, condition, destination_mode, _, _, _ = jump
+        always = condition_mode == 1 and (condition != 0) == (jump_op == JUMP_IF_TRUE)
+        if op == ADJUST_REL_BASE and always:
+            fused = op, m1, p1, Intcode.FUSED, 0, 0, 0
+        elif op == ADJUST_REL_BASE or destination_mode != 1:
+            return None
+        elif always:
+            fused = op, m1, p1, m2, p2, m3 | Intcode.FUSED | Intcode.JUMP_ALWAYS, p3
+        elif (condition_mode, condition) == (m3, p3):
+            flags = Intcode.FUSED | (Intcode.JUMP_IF_SET if jump_op == JUMP_IF_TRUE else 0)
+            fused = op, m1, p1, m2, p2, m3 | flags, p3
+        else:
+            return None
+        return fused
+
+    def _invalidate(self, address):
+        """Drop all cached instructions that cover ADDRESS."""
+        for pos in self._code.pop(address):
+            self._decoded.pop(pos, None)
+
+    def _has_input(self):
+        if self._input_fn is not None or self._input:
+            return True
+        while self._sources:
+            for value in self._sources[0]:
+                self._input.append(value)
+                return True
+            self._sources.popleft()
+        return False
+
+    def _read(self):
+        """Return the next input value. Must be preceded by a successful _has_input()."""
+        return self._input_fn() if self._input_fn else self._input.popleft()
+
+    def _store(self, address, value):
+        self._memory[address] = value
+        if address in self._code:
+            self._invalidate(address)
+
+    def _execute(self, output: list, count: int, steps: Optional[int] = None):
+        """Run until COUNT values are appended to OUTPUT (forever if COUNT is negative),
+        the program halts, it needs input that is not there, or STEPS instructions are executed.
+        Sets STATE accordingly."""
+        self.state = Intcode.RUNNING
+        if steps is None:
+            steps = -1
+        budget = steps
+        memory, decoded, code = self._memory, self._decoded, self._code
+        # Instructions run against the dense cells of memory; if they are not enough,
+        # the instruction is retried once through the memory backend.
+        memory.own()
+        dense = mem = memory.dense
+        pos, rb = self.pos, self.relative_base
+        try:
+            while steps:
+                steps -= 1
+                try:
+                    op, m1, p1, m2, p2, m3, p3 = decoded[pos]
+                except KeyError:
+                    op, m1, p1, m2, p2, m3, p3 = self._decode(pos)
+                if op == EXIT:
+                    self.state = Intcode.HALTED
+                    return
+                if op == READ:
+                    if not self._has_input():
+                        self.state = Intcode.NEEDS_INPUT
+                        steps += 1
+                        return
+                    target = p1 + rb if m1 == 2 else p1
+                    self._store(target, self._read())
+                    pos += 2
+                    continue
+                try:
+                    x = p1 if m1 == 1 else mem[p1 + rb if m1 else p1]
+                    if op == ADD or op == MUL or op == LESS or op == EQUALS:
+                        y = p2 if m2 == 1 else mem[p2 + rb if m2 else p2]
+                        target = p3 + rb if m3 & 2 else p3
+                        if op == ADD:
+                            mem[target] = x + y
+                        elif op == MUL:
+                            mem[target] = x * y
+                        elif op == LESS:
+                            mem[target] = 1 if x < y else 0
+                        else:
+                            mem[target] = 1 if x == y else 0
+                        if target in code:
+                            self._invalidate(target)
+                            pos += 4
+                        elif m3 > 2 and steps:
+                            steps -= 1
+                            if m3 & 8 or (mem[target] != 0) == m3 & 1:
+                                pos = decoded[pos + 4][4]
+                            else:
+                                pos += 7
+                        else:
+                            pos += 4
+                    elif op == JUMP_IF_TRUE:
+                        if x != 0:
+                            pos = p2 if m2 == 1 else mem[p2 + rb if m2 else p2]
+                        else:
+                            pos += 3
+                    elif op == JUMP_IF_FALSE:
+                        if x == 0:
+                            pos = p2 if m2 == 1 else mem[p2 + rb if m2 else p2]
+                        else:
+                            pos += 3
+                    elif op == WRITE:
+                        pos += 2
+                        output.append(x)
+                        count -= 1
+                        if count == 0:
+                            return
+                    elif op == ADJUST_REL_BASE:
+                        if m2 and steps:
+                            _, _, _, destination_mode, destination, _, _ = decoded[pos + 2]
+                            if destination_mode != 1:
+                                destination = mem[destination + rb + x if destination_mode else destination]
+                            steps -= 1
+                            pos = destination
+                        else:
+                            pos += 2
+                        rb += x
+                except IndexError:
+                    if mem is memory:
+                        raise
+                    mem = memory
+                    steps += 1
+                    continue
+                mem = dense
+            self.state = Intcode.SUSPENDED
+        finally:
+            self.pos, self.relative_base = pos, rb
+            self.instructions += budget - steps
+
+    def _execute_profiled(self, output: list, count: int, steps: Optional[int] = None):
+        """Same as _execute, but single-steps through the regular loop and records every instruction in PROFILE."""
+        profile = self.profile
+        execute = type(self)._execute
+        clock = time.perf_counter
+        if profile._waiting_since is not None:
+            profile.blocked += clock() - profile._waiting_since
+            profile._waiting_since = None
+        if steps is None:
+            steps = -1
+        while steps:
+            steps -= 1
+            pos, rb, produced = self.pos, self.relative_base, len(output)
+            op = self._memory[pos] % 100
+            start = clock()
+            execute(self, output, count, 1)
+            elapsed = clock() - start
+            if self.state == Intcode.NEEDS_INPUT:
+                profile._waiting_since = clock()
+                return
+            profile.ops[op] += 1
+            profile.addresses[pos] += 1
+            profile.stacks[profile._stack] += 1
+            if op == READ:
+                profile.blocked += elapsed
+            else:
+                profile.executing += elapsed
+            if self.relative_base > rb:
+                profile._stack += (pos,)
+            elif self.relative_base < rb:
+                profile._stack = profile._stack[:-1]
+            if self.state == Intcode.HALTED:
+                return
+            if len(output) > produced:
+                count -= 1
+                if count == 0:
+                    self.state = Intcode.RUNNING
+                    return
+        self.state = Intcode.SUSPENDED
+
+    def _execute_traced(self, output: list, count: int, steps: Optional[int] = None):
+        """Same as _execute, but single-steps through the regular loop and adds every instruction to TRACER.
+        If an instruction fails, the trace is flushed before the exception propagates."""
+        tracer, memory = self.tracer, self._memory
+        execute = type(self)._execute
+        if steps is None:
+            steps = -1
+        try:
+            while steps:
+                steps -= 1
+                pos, produced = self.pos, len(output)
+                instruction, p1, p2, p3 = memory[pos], memory[pos + 1], memory[pos + 2], memory[pos + 3]
+                op, modes = instruction % 100, instruction // 100
+                if op in (ADD, MUL, LESS, EQUALS):
+                    address = p3 + self.relative_base if modes // 100 % 10 == 2 else p3
+                elif op == READ:
+                    address = p1 + self.relative_base if modes % 10 == 2 else p1
                 else:
-                    self.pos += 3
-            elif op == Intcode.JUMP_IF_FALSE:
-                x, y = self.values(2, modes)
-                if x == 0:
-                    self.pos = y
+                    address = -1
+                execute(self, output, count, 1)
+                if self.state == Intcode.NEEDS_INPUT:
+                    return
+                if len(output) > produced:
+                    tracer.add(pos, instruction, p1, p2, p3, -1, output[-1])
                 else:
-                    self.pos += 3
-            elif op == Intcode.LESS:
-                x, y = self.values(2, modes)
-                relative = self.relative_base if len(modes) == 3 and modes[2] == 2 else 0
-                self._memory[self._memory[self.pos + 3] + relative] = (1 if x < y else 0)
-                self.pos += 4
-            elif op == Intcode.EQUALS:
-                x, y = self.values(2, modes)
-                relative = self.relative_base if len(modes) == 3 and modes[2] == 2 else 0
-                self._memory[self._memory[self.pos + 3] + relative] = (1 if x == y else 0)
-                self.pos += 4
-            elif op == Intcode.ADJUST_REL_BASE:
-                x, = self.values(1, modes)
-                self.relative_base += x
-                self.pos += 2
-            else:
-                raise ValueError(f'Unexpected code {self._memory[self.pos]} at position {self.pos}.\n{self._memory=}')
-        return None
+                    tracer.add(pos, instruction, p1, p2, p3, address, memory[address] if address >= 0 else -1)
+                if self.state == Intcode.HALTED:
+                    return
+                if len(output) > produced:
+                    count -= 1
+                    if count == 0:
+                        self.state = Intcode.RUNNING
+                        return
+            self.state = Intcode.SUSPENDED
+        except Exception:
+            tracer.flush()
+            raise
+
+    def _check_input(self):
+        if self.state == Intcode.NEEDS_INPUT:
+            raise IndexError(f'No input for READ at position {self.pos}')
+
+    def _run(self, output: list, count: int, budget: Optional[int] = None, deadline: Optional[float] = None):
+        """Like _execute with BUDGET as STEPS, but also stops with STATE set to SUSPENDED once time.monotonic()
+        reaches DEADLINE. The clock is read every SLICE_SIZE instructions, so the run may overshoot it by as much."""
+        if self.profile is not None:
+            execute = self._execute_profiled
+        elif self.tracer is not None:
+            execute = self._execute_traced
+        else:
+            execute = self._execute
+        if deadline is None:
+            execute(output, count, budget)
+            return
+        wanted = count + len(output)
+        while True:
+            if time.monotonic() >= deadline:
+                self.state = Intcode.SUSPENDED
+                return
+            steps = Intcode.SLICE_SIZE if budget is None else min(Intcode.SLICE_SIZE, budget)
+            before = self.instructions
+            execute(output, wanted - len(output) if count > 0 else count, steps)
+            if budget is not None:
+                budget -= self.instructions - before
+            if self.state != Intcode.SUSPENDED or (budget is not None and budget <= 0):
+                return
+
+    def run_until_output(self, budget: Optional[int] = None, deadline: Optional[float] = None):
+        """Run until the program produces a value, and return it, or None if the program halts first.
+        Returns SUSPENDED if BUDGET instructions are executed or time.monotonic() reaches DEADLINE first;
+        running again continues where it stopped."""
+        output = []
+        self._run(output, 1, budget, deadline)
+        self._check_input()
+        if self.state == Intcode.SUSPENDED:
+            return Intcode.SUSPENDED
+        return output[0] if output else None
+
+    def run_until_outputs(self, n: int, budget: Optional[int] = None, deadline: Optional[float] = None) -> list:
+        """Run until N values are produced, and return them. Returns fewer values if the program halts,
+        needs more input, or is suspended by BUDGET or DEADLINE first; STATE tells which."""
+        output = []
+        self._run(output, n, budget, deadline)
+        return output
+
+    def run_until_input_needed(self, budget: Optional[int] = None, deadline: Optional[float] = None) -> list:
+        """Run until the program halts or needs more input, and return everything it produced.
+        If BUDGET or DEADLINE is given, it may be suspended before that as well."""
+        output = []
+        self._run(output, -1, budget, deadline)
+        return output
 
-    def run(self, inp: Optional[list] = None) -> list:
+    def run(self, inp: Optional[Iterable] = None, budget: Optional[int] = None,
+            deadline: Optional[float] = None) -> list:
+        """Run the program from the start on INP until it halts, and return its output. If BUDGET or DEADLINE
+        runs out first, returns the output so far with STATE set to SUSPENDED."""
         self.reset(inp)
         output = []
-        while (o := self.run_until_output()) is not None:
-            output.append(o)
+        self._run(output, -1, budget, deadline)
+        self._check_input()
         return output
 
+    @property
+    def halted(self) -> bool:
+        return self.state == Intcode.HALTED
+
+    @property
+    def suspended(self) -> bool:
+        return self.state == Intcode.SUSPENDED
+
     def append_input(self, x):
-        self._input.append(x)
+        if self._sources:
+            self._sources.append(iter((x,)))
+        else:
+            self._input.append(x)
 
     def extend_input(self, a):
-        self._input.extend(a)
+        if self._sources:
+            self._sources.append(iter(list(a)))
+        else:
+            self._input.extend(a)
+
+    def feed(self, iterable: Iterable):
+        """Queue all values of ITERABLE as input. They are consumed lazily, so ITERABLE may be
+        a generator that is much longer than what fits into memory."""
+        self._sources.append(iter(iterable))
 
     @property
     def memory(self):
         """Return the state of the memory after the run."""
-        return self._memory
+        return MemoryView(self)
 
     @property
     def input_fn(self):
@@ -145,3 +568,24 @@ class Intcode:
     @input_fn.setter
     def input_fn(self, l):
         self._input_fn = l
+
+
+class MemoryView:
+    """Sliceable view of the memory of an Intcode computer. Writes through it keep
+    the computer's instruction cache consistent."""
+
+    def __init__(self, computer: Intcode):
+        self._computer = computer
+
+    def __len__(self):
+        return len(self._computer._memory)
+
+    def __getitem__(self, key):
+        return self._computer._memory[key]
+
+    def __iter__(self):
+        # Reads past the end give 0, so iterating by index would never stop.
+        return iter(self._computer._memory[:len(self)])
+
+    def __setitem__(self, address, value):
+        self._computer._store(address, value)
@@ -0,0 +1,215 @@
+"""
+Intcode computer that compiles basic blocks of the program into Python functions.
+"""
+
+import math
+from array import array
+from functools import lru_cache
+from typing import Iterable, Optional
+
+from intcode import Intcode, decode, SIZE, ADD, MUL, READ, WRITE, JUMP_IF_TRUE, JUMP_IF_FALSE, LESS, EQUALS, \
+    ADJUST_REL_BASE
+
+# Returned by a compiled block that reached the EXIT instruction.
+HALT = object()
+
+OPERATORS = {ADD: '{} + {}', MUL: '{} * {}', LESS: '(1 if {} < {} else 0)', EQUALS: '(1 if {} == {} else 0)'}
+
+
+def operand(mode, param, address, live):
+    """Python expression for reading the parameter stored at ADDRESS. MEM stands for the memory being read.
+    A LIVE parameter is read from memory on every run instead of being baked into the code."""
+    if address in live:
+        param = f'MEM[{address}]'
+    if mode == 0:
+        return f'MEM[{param}]'
+    elif mode == 1:
+        return str(param)
+    else:
+        return f'MEM[rb + ({param})]'
+
+
+def guarded(statement, indent='    '):
+    """Run STATEMENT against the dense memory, and retry it through the memory backend
+    if it touches an address outside of it."""
+    return [f'{indent}try:',
+            f'{indent}    {statement.replace("MEM", "m")}',
+            f'{indent}except IndexError:',
+            f'{indent}    {statement.replace("MEM", "M")}']
+
+
+class Shared:
+    """Compilation results shared by all the machines running the same program."""
+
+    def __init__(self, program: bytes):
+        self.program = array('q')
+        self.program.frombytes(program)
+        # Compiled functions keyed by the block's start and contents, with live cells replaced by None.
+        self.functions = {}
+        # Blocks compiled from unmodified program code, and the code map for them: a fresh machine starts with these.
+        self.blocks = {}
+        self.code = {}
+        # Addresses of all decoded instructions, and the parameter cells that the program writes to.
+        self.instructions = set()
+        self.live = set()
+
+
+@lru_cache(maxsize=64)
+def shared(program: bytes) -> Shared:
+    return Shared(program)
+
+
+class CompiledIntcode(Intcode):
+    """Intcode computer that translates every basic block into a Python function with all the parameter modes
+    resolved, and then runs these functions. A write that hits a block's code throws the block away. If it hit
+    a parameter, the parameter is compiled as a memory read from then on, so that programs patching their own
+    parameters (like the day 13 game does for array access) do not keep recompiling."""
+
+    def __init__(self, program, **kwargs):
+        if kwargs.get('profile') or kwargs.get('tracer') is not None:
+            raise ValueError('Profiling and tracing need the interpreter: use Intcode')
+        self._blocks = {}
+        self._shared = None
+        super().__init__(program, **kwargs)
+
+    def reset(self, inp: Optional[Iterable] = None):
+        super().reset(inp)
+        if self._shared is None:
+            self._shared = shared(self._memory.program.tobytes())
+        self._blocks = dict(self._shared.blocks)
+        self._code = dict(self._shared.code)
+
+    def _forget_code(self):
+        super()._forget_code()
+        self._blocks = {}
+
+    def fork(self) -> 'CompiledIntcode':
+        clone = super().fork()
+        clone._blocks = dict(self._blocks)
+        return clone
+
+    def _invalidate(self, address):
+        shared = self._shared
+        for pos in self._code.pop(address):
+            self._blocks.pop(pos, None)
+        if address not in shared.instructions and address not in shared.live:
+            shared.live.add(address)
+            for pos in shared.code.get(address, ()):
+                shared.blocks.pop(pos, None)
+
+    def _compile(self, start) -> tuple:
+        """Compile the block starting at START into a function (m, M, rb, code, computer) -> (pos, rb, output),
+        and return it with the number of instructions in the block and whether the block starts with READ.
+        M is the memory backend, and m its dense cells. Output is None unless the block ended with WRITE or EXIT.
+        READ can only be the first instruction of a block, so that a missing input leaves no partial state behind."""
+        shared, memory = self._shared, self._memory
+        live = shared.live
+        lines = ['def block(m, M, rb, code, computer):']
+        pos = end = start
+        size = 0
+        reads = False
+        while True:
+            try:
+                op, m1, p1, m2, p2, m3, p3 = decode(memory, pos)
+            except ValueError:
+                if pos == start:
+                    raise
+                lines.append(f'    return {pos}, rb, None')
+                break
+            if op == READ:
+                if pos != start:
+                    lines.append(f'    return {pos}, rb, None')
+                    break
+                reads = True
+            shared.instructions.add(pos)
+            size += 1
+            following = end = pos + SIZE[op]
+            if op in (ADD, MUL, LESS, EQUALS, READ):
+                m_target, p_target, a_target = (m1, p1, pos + 1) if op == READ else (m3, p3, pos + 3)
+                target = f'MEM[{a_target}]' if a_target in live else p_target
+                if m_target == 2:
+                    target = f'rb + ({target})'
+                if target != p_target:
+                    lines += guarded(f't = {target}') if 'MEM' in target else [f'    t = {target}']
+                    target = 't'
+                if op == READ:
+                    lines.append('    v = computer._read()')
+                    value = 'v'
+                else:
+                    value = OPERATORS[op].format(operand(m1, p1, pos + 1, live), operand(m2, p2, pos + 2, live))
+                lines += guarded(f'MEM[{target}] = {value}')
+                lines += [f'    if {target} in code:',
+                          f'        computer._invalidate({target})',
+                          f'        computer.instructions -= BLOCK_SIZE - {size}',
+                          f'        return {following}, rb, None']
+            elif op == JUMP_IF_TRUE or op == JUMP_IF_FALSE:
+                condition = operand(m1, p1, pos + 1, live)
+                if op == JUMP_IF_FALSE:
+                    condition = f'not {condition}'
+                lines += guarded(f'return ({operand(m2, p2, pos + 2, live)} if {condition} else {following}), '
+                                 f'rb, None')
+                break
+            elif op == WRITE:
+                lines += guarded(f'return {following}, rb, {operand(m1, p1, pos + 1, live)}')
+                break
+            elif op == ADJUST_REL_BASE:
+                lines += guarded(f'rb += {operand(m1, p1, pos + 1, live)}')
+            else:  # EXIT
+                lines.append(f'    return {pos}, rb, HALT')
+                break
+            pos = following
+
+        cells = [a for a in range(start, end) if a not in live]
+        contents = tuple(None if a in live else memory[a] for a in range(start, end))
+        key = start, contents
+        block = shared.functions.get(key)
+        if block is None:
+            namespace = dict(HALT=HALT)
+            exec('\n'.join(lines).replace('BLOCK_SIZE', str(size)), namespace)
+            block = shared.functions[key] = namespace['block'], size, reads
+        self._blocks[start] = block
+        for address in cells:
+            if start not in self._code.get(address, ()):
+                self._code[address] = self._code.get(address, ()) + (start,)
+
+        program = shared.program
+        if start not in shared.blocks and all(memory[a] == (program[a] if a < len(program) else 0) for a in cells):
+            shared.blocks[start] = block
+            for address in cells:
+                shared.code[address] = shared.code.get(address, ()) + (start,)
+        return block
+
+    def _execute(self, output: list, count: int, steps: Optional[int] = None):
+        """Like Intcode._execute, but STEPS is only checked between blocks, and a block leaving early
+        after a write to code still counts in full."""
+        self.state = Intcode.RUNNING
+        if steps is None:
+            steps = math.inf
+        executed = 0
+        memory, blocks = self._memory, self._blocks
+        memory.own()
+        dense = memory.dense
+        pos, rb = self.pos, self.relative_base
+        try:
+            while executed < steps:
+                try:
+                    block, size, reads = blocks[pos]
+                except KeyError:
+                    block, size, reads = self._compile(pos)
+                if reads and not self._has_input():
+                    self.state = Intcode.NEEDS_INPUT
+                    return
+                executed += size
+                pos, rb, value = block(dense, memory, rb, self._code, self)
+                if value is not None:
+                    if value is HALT:
+                        self.state = Intcode.HALTED
+                        return
+                    output.append(value)
+                    count -= 1
+                    if count == 0:
+                        return
+            self.state = Intcode.SUSPENDED
+        finally:
+            self.pos, self.relative_base = pos, rb
+            self.instructions += executed
@@ -0,0 +1,147 @@
+"""
+Memory backends for the Intcode computer.
+
+A backend is created from a program and exposes its directly indexable cells as DENSE, which
+the interpreter uses on its fast path. Every other address goes through __getitem__ and __setitem__,
+which also accept slices for reading. RESET restores the program, FORK returns a copy-on-write
+clone, and OWN must be called before writing to DENSE directly.
+"""
+
+import copy
+import mmap
+from array import array
+
+PAGE_BITS = 12
+
+
+class SparseMemory:
+    """Memory made of a dense prefix holding the program, and pages of 2 ** PAGE_BITS cells
+    beyond it, stored as dicts. The prefix grows when writes land close to its end, so that stacks
+    and variables placed right after the program stay on the fast path. The pristine program is kept
+    as a compact array('q'), while the prefix is a list: reading from an array boxes a new int every
+    time, which makes the interpreter noticeably slower.
+
+    Forks share the prefix and the pages with their parent. A page is copied by whichever side
+    writes to it first, and the prefix by whichever side runs first."""
+
+    GROWTH = 4096
+
+    def __init__(self, program):
+        # An array('q') or a read-only view of one, like the programs returned by load_program, is shared
+        # rather than copied.
+        if isinstance(program, array) and program.typecode == 'q' or \
+                isinstance(program, memoryview) and program.format == 'q' and program.readonly:
+            self.program = program
+        else:
+            self.program = array('q', program)
+        self.dense = list(self.program)
+        self.pages = {}
+        self._shared = False
+        self._shared_pages = set()
+
+    def reset(self):
+        """Restore the program and forget everything else that was written. Cells past the program are
+        dropped whatever their number, but the program itself is copied back in full: a single list copy
+        of a few thousand cells is cheaper than tracking dirty cells on every write of the interpreter."""
+        if self._shared:
+            self.dense = list(self.program)
+            self._shared = False
+        else:
+            self.dense[:] = self.program
+        self.pages = {}
+        self._shared_pages = set()
+
+    def fork(self) -> 'SparseMemory':
+        clone = copy.copy(self)
+        clone.pages = dict(self.pages)
+        self._shared = clone._shared = True
+        self._shared_pages = set(self.pages)
+        clone._shared_pages = set(self.pages)
+        return clone
+
+    def own(self):
+        if self._shared:
+            self.dense = list(self.dense)
+            self._shared = False
+
+    def __len__(self):
+        return max(len(self.dense), max((max(page) for page in self.pages.values() if page), default=-1) + 1)
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return [self[i] for i in range(*key.indices(len(self)))]
+        if key < 0:
+            raise IndexError(f'Negative address {key}')
+        if key < len(self.dense):
+            return self.dense[key]
+        page = self.pages.get(key >> PAGE_BITS)
+        return page.get(key, 0) if page else 0
+
+    def _page(self, key) -> dict:
+        """Return the page holding KEY, ready for writing."""
+        n = key >> PAGE_BITS
+        if n in self._shared_pages:
+            self._shared_pages.remove(n)
+            self.pages[n] = dict(self.pages[n])
+        return self.pages.setdefault(n, {})
+
+    def __setitem__(self, key, value):
+        if key < 0:
+            raise IndexError(f'Negative address {key}')
+        # Not self.own(): a run may be holding on to DENSE, so subclasses must not replace it here.
+        SparseMemory.own(self)
+        dense = self.dense
+        if key >= len(dense) and key < len(dense) + SparseMemory.GROWTH:
+            start = len(dense)
+            dense.extend([0] * (key + 1 - start))
+            for n in range(start >> PAGE_BITS, (key >> PAGE_BITS) + 1):
+                for address in [a for a in self.pages.get(n, ()) if a < len(dense)]:
+                    dense[address] = self._page(address).pop(address)
+        if key < len(dense):
+            dense[key] = value
+        else:
+            self._page(key)[key] = value
+
+
+class MappedMemory(SparseMemory):
+    """SparseMemory whose program and dense prefix are views of a private memory mapping of a file holding
+    packed 64-bit cells, at the byte offsets PROGRAM and DENSE (pairs of start and end). Cells are read from
+    disk when first touched, and writes never reach the file.
+
+    The mapped prefix cannot grow, so cells written right past it are kept in pages, and the next OWN,
+    which comes before a run, turns the prefix into a list that holds them."""
+
+    def __init__(self, path: str, program: tuple, dense: tuple, pages: dict):
+        with open(path, 'rb') as f:
+            view = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY))
+        self.program = view[slice(*program)].cast('q')
+        self.dense = view[slice(*dense)].cast('q')
+        self.pages = pages
+        self._shared = False
+        self._shared_pages = set()
+        # The highest address written right past the mapped prefix, if any.
+        self._spilled = None
+
+    def reset(self):
+        # The prefix starts out as the mapped program, which the next OWN turns into a list.
+        self.dense = self.program
+        self._shared = True
+        self._spilled = None
+        self.pages = {}
+        self._shared_pages = set()
+
+    def own(self):
+        super().own()
+        if self._spilled is not None:
+            top, self._spilled = self._spilled, None
+            self.dense = list(self.dense)
+            # Growing the prefix up to TOP moves all the spilled cells into it.
+            super().__setitem__(top, self[top])
+
+    def __setitem__(self, key, value):
+        dense = self.dense
+        if not isinstance(dense, list) and len(dense) <= key < len(dense) + SparseMemory.GROWTH:
+            self._page(key)[key] = value
+            self._spilled = key if self._spilled is None else max(self._spilled, key)
+        else:
+            super().__setitem__(key, value)
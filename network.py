@@ -0,0 +1,66 @@
+"""
+Networks of Intcode computers connected by channels.
+"""
+
+import time
+from collections import defaultdict, deque
+from typing import Optional
+
+from intcode import Intcode
+
+
+class Network:
+    """Intcode computers connected by channels. Every output of a computer is sent as input
+    to all the computers it is connected to."""
+
+    # Values returned by RUN.
+    HALTED = 'halted'
+    DEADLOCK = 'deadlock'
+    SUSPENDED = 'suspended'
+
+    def __init__(self):
+        self.computers = {}
+        self.links = defaultdict(list)
+        # The last value produced by each computer.
+        self.last = {}
+
+    def add(self, name, computer: Intcode):
+        self.computers[name] = computer
+
+    def connect(self, source, destination):
+        self.links[source].append(destination)
+
+    def send(self, name, *values):
+        self.computers[name].extend_input(values)
+
+    def run(self, budget: Optional[int] = None, deadline: Optional[float] = None) -> str:
+        """Run every computer until it needs input, delivering all its outputs at once, and repeat for the
+        computers that got new input. Returns HALTED once all computers halt, or DEADLOCK if some are still
+        waiting for input that nobody is going to send.
+
+        If BUDGET is given, a computer runs for at most that many instructions at a time and then goes to
+        the back of the queue, so that one busy computer does not hold up the others. If time.monotonic() reaches
+        DEADLINE, returns SUSPENDED instead; running again continues."""
+        ready = deque(self.computers)
+        queued = set(ready)
+        while ready:
+            name = ready.popleft()
+            queued.remove(name)
+            output = self.computers[name].run_until_input_needed(budget, deadline)
+            if output:
+                self.last[name] = output[-1]
+                for destination in self.links[name]:
+                    computer = self.computers[destination]
+                    computer.extend_input(output)
+                    if destination not in queued and not computer.halted:
+                        ready.append(destination)
+                        queued.add(destination)
+            if self.computers[name].suspended:
+                if deadline is not None and time.monotonic() >= deadline:
+                    return Network.SUSPENDED
+                if name not in queued:
+                    ready.append(name)
+                    queued.add(name)
+        if all(computer.halted for computer in self.computers.values()):
+            return Network.HALTED
+        return Network.DEADLOCK
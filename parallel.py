@@ -0,0 +1,104 @@
+"""
+Running many Intcode computers on all the cores.
+"""
+
+import itertools
+import multiprocessing
+import os
+import sys
+from array import array
+from concurrent.futures import Executor, ProcessPoolExecutor, as_completed, wait, FIRST_COMPLETED
+from typing import Callable, Iterable, Optional
+
+from intcode import Intcode
+
+
+def chunked(iterable: Iterable, n: int) -> Iterable[list]:
+    """Split ITERABLE into lists of N elements (the last one may be shorter)."""
+    iterator = iter(iterable)
+    while chunk := list(itertools.islice(iterator, n)):
+        yield chunk
+
+
+def unordered_map(pool: Executor, fn: Callable, iterable: Iterable, in_flight: int) -> Iterable:
+    """Like POOL.map for a function of one argument, but yields results as soon as they are ready,
+    and keeps at most IN_FLIGHT tasks submitted at a time."""
+    pending = set()
+    for argument in iterable:
+        pending.add(pool.submit(fn, argument))
+        if len(pending) >= in_flight:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            yield from (future.result() for future in done)
+    yield from (future.result() for future in as_completed(pending))
+
+
+# State of a sweep worker process, set up once by _init_sweep and reused for every chunk.
+_computer = _addresses = _predicate = _inp = _stop = _budget = None
+
+
+def _init_sweep(program, addresses, predicate, inp, stop, engine, budget):
+    global _computer, _addresses, _predicate, _inp, _stop, _budget
+    _computer, _addresses, _predicate, _inp, _stop, _budget = engine(program), addresses, predicate, inp, stop, budget
+
+
+def _search(index: int, combinations: list) -> Optional[tuple]:
+    """Return the first of COMBINATIONS satisfying the predicate, unless an earlier chunk already has a hit."""
+    for values in combinations:
+        if _stop.value < index:
+            return None
+        if _try(_computer, _addresses, values, _predicate, _inp, _budget):
+            with _stop.get_lock():
+                _stop.value = min(_stop.value, index)
+            return values
+    return None
+
+
+def _try(computer: Intcode, addresses: tuple, values: tuple, predicate: Callable, inp,
+         budget: Optional[int] = None) -> bool:
+    computer.reset(inp)
+    for address, value in zip(addresses, values):
+        computer.memory[address] = value
+    computer.run_until_input_needed(budget)
+    return not computer.suspended and predicate(computer)
+
+
+def sweep(program, overrides: dict, predicate: Callable[[Intcode], bool], inp=(), workers=None, chunk_size=256,
+          engine=Intcode, budget: Optional[int] = None) -> Optional[dict]:
+    """Run PROGRAM with INP for every combination of values in OVERRIDES, which maps addresses to the values
+    to put there, and return the first combination (in the order of itertools.product) for which PREDICATE
+    is true for the computer after the run, or None. PREDICATE must be picklable, e.g. a module-level function.
+
+    Combinations are searched in chunks of CHUNK_SIZE by WORKERS processes (all cores by default), each reusing
+    one computer. Once a chunk has a hit, chunks after it are skipped. If BUDGET is given, a combination whose run
+    takes more than BUDGET instructions is given up on, and counts as a miss."""
+    addresses = tuple(overrides)
+    # Every combination runs on the same input, so an iterator must not be used up by the first one.
+    inp = tuple(inp)
+    grid = itertools.product(*(overrides[a] for a in addresses))
+    workers = workers or os.cpu_count()
+    if workers == 1:
+        computer = engine(program)
+        for values in grid:
+            if _try(computer, addresses, values, predicate, inp, budget):
+                return dict(zip(addresses, values))
+        return None
+
+    stop = multiprocessing.Value('q', sys.maxsize)
+    hits = {}
+    with ProcessPoolExecutor(workers, initializer=_init_sweep,
+                             initargs=(array('q', program), addresses, predicate, inp, stop, engine, budget)) as pool:
+        pending = {}
+        for index, combinations in enumerate(chunked(grid, chunk_size)):
+            if index > stop.value:
+                break
+            pending[pool.submit(_search, index, combinations)] = index
+            if len(pending) >= 4 * workers:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    if (values := future.result()) is not None:
+                        hits[pending[future]] = values
+                    del pending[future]
+        for future in pending:
+            if (values := future.result()) is not None:
+                hits[pending[future]] = values
+    return dict(zip(addresses, hits[min(hits)])) if hits else None
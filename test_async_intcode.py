@@ -0,0 +1,41 @@
+"""
+Tests for Intcode computers running as asyncio tasks.
+"""
+
+import asyncio
+
+from async_intcode import AsyncIntcode
+from day7 import FeedbackAmplifiers
+from intcode import Intcode
+from jit import CompiledIntcode
+
+FEEDBACK = [3, 52, 1001, 52, -5, 52, 3, 53, 1, 52, 56, 54, 1007, 54, 5, 55, 1005, 55, 26, 1001, 54,
+            -5, 54, 1105, 1, 12, 1, 53, 54, 53, 1008, 54, 0, 55, 1001, 55, 1, 55, 2, 53, 55, 53, 4,
+            53, 1001, 56, -1, 56, 1005, 56, 6, 99, 0, 0, 0, 0, 10]
+
+
+async def feedback_ring(phases, engine) -> int:
+    queues = [asyncio.Queue() for _ in phases]
+    amps = [AsyncIntcode(FEEDBACK, engine=engine, inbox=queues[i], outbox=queues[(i + 1) % len(phases)],
+                         slice_size=7)
+            for i in range(len(phases))]
+    for queue, phase in zip(queues, phases):
+        queue.put_nowait(phase)
+    queues[0].put_nowait(0)
+    await asyncio.gather(*(amp.run() for amp in amps))
+    return queues[0].get_nowait()
+
+
+def test_feedback_ring():
+    phases = (9, 7, 8, 5, 6)
+    expected = FeedbackAmplifiers(FEEDBACK).run(phases)
+    assert expected == 18216
+    for engine in (Intcode, CompiledIntcode):
+        assert asyncio.run(feedback_ring(phases, engine)) == expected
+
+
+def test_many_rings():
+    async def many():
+        return await asyncio.gather(*(feedback_ring((9, 7, 8, 5, 6), CompiledIntcode) for _ in range(200)))
+
+    assert asyncio.run(many()) == [18216] * 200
@@ -0,0 +1,53 @@
+"""
+Tests for the batch Intcode engine.
+"""
+
+import itertools
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from batch import BatchIntcode, run_grid
+from intcode import Intcode, load_program
+
+
+def test_batch_matches_interpreter():
+    # Compares its input with 8 and prints 999, 1000 or 1001, with different paths through the code.
+    program = [3, 21, 1008, 21, 8, 20, 1005, 20, 22, 107, 8, 21, 20, 1006, 20, 31,
+               1106, 0, 36, 98, 0, 0, 1002, 21, 125, 20, 4, 20, 1105, 1, 46, 104,
+               999, 1105, 1, 46, 1101, 1000, 1, 20, 4, 20, 1105, 1, 46, 98, 99]
+    batch = BatchIntcode(program, 16, ([i] for i in range(16)))
+    assert batch.run() == [Intcode(program).run([i]) for i in range(16)]
+    assert batch.halted
+    quine = [109, 1, 204, -1, 1001, 100, 1, 100, 1008, 100, 16, 101, 1006, 101, 0, 99]
+    assert BatchIntcode(quine, 3).run() == [quine] * 3
+
+
+def test_batch_input():
+    # Adds its inputs, printing the running sum after each one.
+    program = [3, 100, 1, 100, 101, 101, 4, 101, 1105, 1, 0]
+    batch = BatchIntcode(program, 2, [[1, 2], [10]])
+    assert batch.run() == [[1, 3], [10]]
+    assert list(batch.state) == [Intcode.NEEDS_INPUT] * 2
+    batch.inputs[1].append(5)
+    assert batch.run() == [[1, 3], [10, 15]]
+    assert batch.memory.shape[1] > 101
+
+
+def test_day2_grid():
+    combinations, batch = run_grid(load_program('inputs/day2.txt'), {1: range(100), 2: range(100)})
+    assert batch.halted
+    hit, = np.flatnonzero(batch.memory[:, 0] == 19690720)
+    assert tuple(combinations[hit]) == (23, 47)
+
+
+def test_day7_phases():
+    program = load_program('inputs/day7.txt')
+    permutations = list(itertools.permutations(range(5)))
+    signals = [0] * len(permutations)
+    for stage in range(5):
+        batch = BatchIntcode(program, len(permutations),
+                             ([phases[stage], signal] for phases, signal in zip(permutations, signals)))
+        signals = [output for output, in batch.run()]
+    assert max(signals) == 77500
@@ -0,0 +1,33 @@
+"""
+Tests for the benchmark harness.
+"""
+
+import json
+
+import benchmark
+from intcode import Intcode
+
+
+def test_counting():
+    cls, machines = benchmark.counting(Intcode)
+    cls([104, 1, 99]).run()
+    cls([1101, 1, 1, 0, 99]).run()
+    assert sum(machine.instructions for machine in machines) == 4
+
+
+def test_measure_and_record(tmp_path):
+    result = benchmark.measure('day9', 'compiled')
+    assert result['instructions'] == 371206
+    assert result['instructions_per_second'] > 0 and result['peak_rss'] > 0 and result['traced_peak'] > 0
+    history = tmp_path / 'history.json'
+    benchmark.record(str(history), [result], label='first')
+    benchmark.record(str(history), [result])
+    runs = json.loads(history.read_text())
+    assert [run['label'] for run in runs] == ['first', '']
+    assert runs[0]['results'] == [result]
+
+
+def test_autopilot_instructions():
+    chase = benchmark.measure('day13', 'compiled')
+    autopilot = benchmark.measure('autopilot', 'compiled')
+    assert autopilot['instructions'] < chase['instructions']
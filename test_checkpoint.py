@@ -0,0 +1,81 @@
+"""
+Tests for Intcode checkpoints.
+"""
+
+import pytest
+
+import checkpoint
+from day13 import Arcade
+from intcode import Intcode
+from jit import CompiledIntcode
+
+
+def test_save_and_resume(tmp_path):
+    path = str(tmp_path / 'checkpoint')
+    # Adds its inputs, printing the running sum after each one, and keeps the sum far away.
+    program = [3, 100, 1, 100, 10 ** 6, 10 ** 6, 4, 10 ** 6, 1105, 1, 0]
+    for engine in (Intcode, CompiledIntcode):
+        comp = engine(program)
+        comp.extend_input([1, 2, 3])
+        assert comp.run_until_outputs(2) == [1, 3]
+        checkpoint.save(comp, path)
+        resumed = checkpoint.resume(path, engine)
+        assert resumed.run_until_input_needed() == comp.run_until_input_needed() == [6]
+        assert isinstance(resumed, engine) and resumed.memory[10 ** 6] == 6 and resumed.memory[100] == 3
+        # The file is not changed by the resumed computer, so it can be resumed again.
+        again = checkpoint.resume(path, engine)
+        again.append_input(10)
+        assert again.run_until_input_needed() == [6, 16]
+        again.reset([5])
+        assert again.run_until_input_needed() == [5]
+    comp.feed(iter([1]))
+    with pytest.raises(ValueError):
+        checkpoint.save(comp, path)
+
+
+def test_resume_is_lazy(tmp_path):
+    path = str(tmp_path / 'checkpoint')
+    # Stores 3 at 3000, then reads a value into the next cell and prints it.
+    comp = Intcode([1101, 1, 2, 3000, 3, 3001, 4, 3001, 99])
+    assert comp.run_until_input_needed() == []
+    checkpoint.save(comp, path)
+    resumed = checkpoint.resume(path)
+    memory = resumed._memory
+    assert isinstance(memory.dense, memoryview) and len(memory.dense) == 3001
+    resumed.append_input(7)
+    assert resumed.run_until_input_needed() == [7] and resumed.halted
+    # The cell written past the mapped prefix moves into it before the next run.
+    assert isinstance(memory.dense, memoryview) and memory.pages
+    memory.own()
+    assert memory.dense[3000:] == [3, 7] and not any(memory.pages.values())
+    # Starting over does not read the mapped program either, until the run.
+    resumed.reset([8])
+    assert memory.dense is memory.program and not memory.pages
+    assert resumed.run_until_input_needed() == [8] and isinstance(memory.dense, list)
+
+
+def test_periodic_checkpoints(tmp_path):
+    path = str(tmp_path / 'checkpoint')
+    # Reads a number N, then outputs N, N-1, ..., 1 and asks for the next number.
+    comp = Intcode([3, 20, 1005, 20, 6, 99, 4, 20, 1001, 20, -1, 20, 1005, 20, 6, 1105, 1, 0])
+    comp.append_input(100)
+    assert checkpoint.run_until_input_needed(comp, path, every=7, budget=30) == list(range(100, 90, -1))
+    resumed = checkpoint.resume(path)
+    assert (resumed.pos, resumed.instructions) == (comp.pos, 0)
+    assert resumed.run_until_input_needed() == comp.run_until_input_needed() == list(range(90, 0, -1))
+    assert checkpoint.run_until_input_needed(comp, path, every=7) == []
+    assert checkpoint.resume(path).state == Intcode.NEEDS_INPUT
+
+
+def test_checkpointed_game(tmp_path):
+    path = str(tmp_path / 'checkpoint')
+    arcade = Arcade('inputs/day13.txt', quarters=2)
+    arcade.draw()
+    checkpoint.save(arcade.brain, path)
+    for engine in (Intcode, CompiledIntcode):
+        resumed = Arcade('inputs/day13.txt', engine=engine)
+        resumed.brain = checkpoint.resume(path, engine)
+        resumed.ball, resumed.paddle = arcade.ball, arcade.paddle
+        while not resumed.brain.halted:
+            resumed.draw()
+        assert resumed.score == 19297
@@ -0,0 +1,64 @@
+"""
+Tests for the disassembler.
+"""
+
+from day13 import Arcade
+from disasm import Instruction, basic_blocks, data_writes, disassemble, listing, self_modifying
+from intcode import Intcode, ADD, load_program
+from jit import CompiledIntcode
+
+# Counts down from its input: 0: read n; 2: call 19; 9: print n; 11: n -= 1, jump to 2 while n != 0;
+# 18: halt; 19: a function that patches the increment at 13 and returns; 26: data.
+PROGRAM = [3, 26,
+           21101, 9, 0, 0, 1105, 1, 19,
+           4, 26,
+           1001, 26, -1, 26, 1005, 26, 2,
+           99,
+           1101, 0, -1, 13, 2106, 0, 0,
+           0]
+
+
+def test_disassemble():
+    instructions = disassemble(PROGRAM)
+    assert sorted(instructions) == [0, 2, 6, 9, 11, 15, 18, 19, 23]
+    assert instructions[11] == Instruction(11, ADD, ((0, 26), (1, -1), (0, 26)))
+    blocks = basic_blocks(instructions)
+    assert {start: (block.instructions, block.successors, block.indirect) for start, block in blocks.items()} == {
+        0: ([0], [2], False),
+        2: ([2, 6], [19, 9], False),
+        9: ([9, 11, 15], [18, 2], False),
+        18: ([18], [], False),
+        19: ([19, 23], [], True),
+    }
+    assert data_writes(instructions) == {13, 26}
+    assert self_modifying(instructions) == {11}
+    assert listing(PROGRAM).splitlines()[-10:] == [
+        '     9:',
+        '     9    WRITE           [26]',
+        '    11 *  ADD             [26], #-1, [26]',
+        '    15    JUMP_IF_TRUE    [26], #2',
+        '    18:',
+        '    18    EXIT',
+        '    19:',
+        '    19    ADD             #0, #-1, [13]',
+        '    23    JUMP_IF_FALSE   #0, [rb+0]',
+        '    26    .data 0',
+    ]
+    assert Intcode(PROGRAM).run([2]) == [2, 1]
+
+
+def test_real_programs():
+    program = load_program('inputs/day9.txt')
+    comp = Intcode(program, profile=True)
+    assert comp.run([1]) == [2682107844]
+    # Everything that runs is found statically, except one function only reached through an address on the stack.
+    assert set(comp.profile.addresses) - set(disassemble(program)) == {475}
+    assert set(comp.profile.addresses) <= set(disassemble(program, entries=(0, 475)))
+
+    # The parameters the game patches at run time are among the writes to code found statically.
+    arcade = Arcade('inputs/day13.txt', quarters=2, engine=CompiledIntcode)
+    while not arcade.brain.halted:
+        arcade.draw()
+    instructions = disassemble(load_program('inputs/day13.txt'))
+    assert arcade.brain._shared.live <= data_writes(instructions)
+    assert all(any(pos < cell < pos + 4 for pos in self_modifying(instructions)) for cell in arcade.brain._shared.live)
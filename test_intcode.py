@@ -2,7 +2,17 @@
 Test for Intcode computer.
 """
 
-from intcode import Intcode
+import io
+import itertools
+import os
+import time
+from array import array
+
+import pytest
+
+from intcode import Intcode, load_program
+from jit import CompiledIntcode
+from memory import SparseMemory, PAGE_BITS
 
 
 def test_intcode_basic_program():
@@ -70,4 +80,236 @@ def test_large_example():
                     999, 1105, 1, 46, 1101, 1000, 1, 20, 4, 20, 1105, 1, 46, 98, 99])
     assert comp.run([-42]) == [999]
     assert comp.run([8]) == [1000]
-    assert comp.run([57]) == [1001]
\ No newline at end of file
+    assert comp.run([57]) == [1001]
+
+
+def test_self_modifying_code():
+    # The loop rewrites the operand of the output instruction, so cached decodings must be dropped.
+    comp = Intcode([4, 20, 1001, 1, 1, 1, 1007, 1, 23, 19, 1005, 19, 0, 99, 0, 0, 0, 0, 0, 0, 10, 11, 12])
+    assert comp.run() == [10, 11, 12]
+    assert comp.run() == [10, 11, 12]
+
+
+def test_far_memory():
+    program = [3, 0, 1001, 0, 1, 5000, 1001, 0, 2, 2000000, 4, 5000, 4, 2000000, 99]
+    comp = Intcode(program)
+    assert comp.run([10]) == [11, 12]
+    assert comp.memory[5000] == 11
+    assert comp.memory[2000000] == 12
+    comp.reset()
+    assert comp.memory[:len(program)] == program
+    assert comp.memory[5000] == 0 and comp.memory[2000000] == 0
+
+
+def test_memory_iteration():
+    comp = Intcode([1101, 2, 3, 5, 99, 0])
+    assert list(comp.memory) == [1101, 2, 3, 5, 99, 0]
+    assert 99 in comp.memory and 7 not in comp.memory
+    comp.run()
+    assert list(comp.memory) == [1101, 2, 3, 5, 99, 5]
+
+
+def test_sparse_memory():
+    memory = SparseMemory([1, 2, 3])
+    memory[10] = 4
+    memory[10 ** 9] = 5
+    assert len(memory.dense) == 11
+    assert memory.pages == {10 ** 9 >> PAGE_BITS: {10 ** 9: 5}}
+    assert memory[:4] == [1, 2, 3, 0]
+    assert memory[10 ** 9] == 5 and memory[10 ** 9 + 1] == 0
+    memory.reset()
+    assert memory[:] == [1, 2, 3]
+
+
+def test_batched_output():
+    # Reads a number N, then outputs N, N-1, ..., 1 and asks for the next number; 0 halts.
+    program = [3, 20, 1005, 20, 6, 99, 4, 20, 1001, 20, -1, 20, 1005, 20, 6, 1105, 1, 0]
+    comp = Intcode(program)
+    comp.append_input(5)
+    assert comp.run_until_outputs(2) == [5, 4]
+    assert comp.state == Intcode.RUNNING
+    assert comp.run_until_input_needed() == [3, 2, 1]
+    assert comp.state == Intcode.NEEDS_INPUT
+    assert comp.run_until_outputs(10) == []
+    comp.append_input(2)
+    assert comp.run_until_outputs(10) == [2, 1]
+    comp.append_input(0)
+    assert comp.run_until_input_needed() == []
+    assert comp.halted
+
+
+def test_feed_input():
+    # Sums its input until it reads 0.
+    program = [3, 100, 1006, 100, 12, 1, 100, 101, 101, 1105, 1, 0, 4, 101, 99]
+    comp = Intcode(program)
+    comp.feed(itertools.chain(range(1, 100_001), [0]))
+    assert comp.run_until_output() == 5_000_050_000
+    assert comp.run(iter([1, 2, 0])) == [3]
+    comp.reset([1])
+    comp.feed(x for x in [2, 3])
+    comp.append_input(4)
+    comp.extend_input([5, 0])
+    assert comp.run_until_input_needed() == [15]
+
+
+def test_fork():
+    # Adds its inputs, printing the running sum after each one.
+    program = [3, 100, 1, 100, 101, 101, 4, 101, 1105, 1, 0]
+    for engine in (Intcode, CompiledIntcode):
+        comp = engine(program)
+        comp.feed(iter([1, 2]))
+        assert comp.run_until_output() == 1
+        clone = comp.fork()
+        snapshot = comp.snapshot()
+        assert comp.run_until_input_needed() == [3]
+        clone.append_input(10)
+        assert clone.run_until_input_needed() == [3, 13]
+        assert comp.memory[101] == 3 and clone.memory[101] == 13
+        for _ in range(2):
+            comp.restore(snapshot)
+            assert comp.run_until_input_needed() == [3]
+
+
+def test_fork_pages():
+    memory = SparseMemory([1, 2, 3])
+    memory[10 ** 6] = 1
+    memory[2 * 10 ** 6] = 2
+    clone = memory.fork()
+    clone[10 ** 6] = 10
+    clone[0] = 0
+    assert memory[:3] == [1, 2, 3] and memory[10 ** 6] == 1
+    assert clone[:3] == [0, 2, 3] and clone[10 ** 6] == 10
+    # Only the page that was written to got copied.
+    assert clone.pages[2 * 10 ** 6 >> PAGE_BITS] is memory.pages[2 * 10 ** 6 >> PAGE_BITS]
+    assert clone.pages[10 ** 6 >> PAGE_BITS] is not memory.pages[10 ** 6 >> PAGE_BITS]
+
+
+def test_profile():
+    # Reads a value and prints it twice, once from inside a stack frame.
+    program = [3, 50, 109, 10, 4, 50, 109, -10, 4, 50, 99]
+    comp = Intcode(program, profile=True)
+    assert comp.run_until_input_needed() == []
+    time.sleep(0.01)
+    comp.append_input(7)
+    assert comp.run_until_output() == 7
+    assert comp.run_until_input_needed() == [7]
+    assert comp.halted
+    profile = comp.profile.as_dict()
+    assert profile['instructions'] == 6
+    assert profile['ops'] == {'ADJUST_REL_BASE': 2, 'WRITE': 2, 'READ': 1, 'EXIT': 1}
+    assert profile['addresses'] == {0: 1, 2: 1, 4: 1, 6: 1, 8: 1, 10: 1}
+    assert profile['blocked'] >= 0.01 > profile['executing'] > 0
+    folded = io.StringIO()
+    comp.profile.write_folded(folded)
+    assert folded.getvalue() == 'main 4\nmain;fn_2 2\n'
+    assert Intcode(program).profile is None
+
+
+def test_fork_profiled():
+    # A fork of a profiled machine runs itself, not its parent, and counts into the same profile.
+    program = [3, 50, 109, 10, 4, 50, 109, -10, 4, 50, 99]
+    comp = Intcode(program, profile=True)
+    assert comp.run_until_input_needed() == []
+    clone = comp.fork()
+    clone.append_input(7)
+    assert clone.run_until_input_needed() == [7, 7] and clone.halted
+    assert comp.state == Intcode.NEEDS_INPUT and comp.pos == 0
+    assert comp.profile.instructions == 6
+    comp.append_input(8)
+    assert comp.run_until_input_needed() == [8, 8] and comp.halted
+
+
+def test_instruction_count():
+    program = [3, 20, 1005, 20, 6, 99, 4, 20, 1001, 20, -1, 20, 1005, 20, 6, 1105, 1, 0]
+    for engine in (Intcode, CompiledIntcode):
+        comp = engine(program)
+        comp.append_input(2)
+        assert comp.run_until_input_needed() == [2, 1]
+        # READ, JUMP, then WRITE, ADD, JUMP twice, and the jump back to READ, which waits for input.
+        assert comp.instructions == 9
+        comp.append_input(0)
+        comp.run_until_input_needed()
+        assert comp.instructions == 12
+    # Writing to the code in the middle of a compiled block only counts what was executed.
+    comp = CompiledIntcode([1101, 7, 0, 5, 104, 0, 99])
+    assert comp.run() == [7]
+    assert comp.instructions == 3
+
+
+def test_fused_instructions():
+    # Counts down from its input: 0: read n; 2: call 19; 9: print n; 11: n -= 1, jump to 2 while n != 0;
+    # 18: halt; 19: a function that grows the stack and shrinks it back before returning.
+    program = [3, 100,
+               21101, 9, 0, 0, 1105, 1, 19,
+               4, 100,
+               1001, 100, -1, 100, 1005, 100, 2,
+               99,
+               109, 2, 109, -2, 2106, 0, 0]
+    comp = Intcode(program)
+    assert comp.run([3]) == [3, 2, 1]
+    # Store and call, decrement and loop, and rel base and return are fused, but still count as two instructions.
+    assert comp._decoded[2][5] & Intcode.FUSED and comp._decoded[11][5] & Intcode.FUSED
+    assert comp._decoded[21][3] == Intcode.FUSED
+    assert comp.instructions == 1 + 3 * 8 + 1
+    # A budget of one instruction stops in the middle of a fused pair.
+    comp.reset([2])
+    assert [comp.run_until_input_needed(1) for _ in range(5)] == [[]] * 5
+    assert comp.pos == 23 and comp.instructions == 26 + 5
+    assert comp.run_until_input_needed() == [2, 1]
+    # Overwriting the jump drops the fused instruction: the loop now jumps straight to the end.
+    comp.reset([3])
+    assert comp.run_until_outputs(2) == [3, 2]
+    comp.memory[17] = 18
+    assert comp.run_until_input_needed() == []
+    assert comp.halted and comp.memory[100] == 1
+
+
+def test_load_program(tmp_path):
+    path = tmp_path / 'program.txt'
+    path.write_text('1,0,0,3,\n104,-7,99\n')
+    program = load_program(str(path))
+    assert program == array('q', [1, 0, 0, 3, 104, -7, 99])
+    assert load_program(str(path)) is program
+    # Machines share the parsed image instead of copying it.
+    comp = Intcode.from_file(str(path))
+    assert comp._memory.program is program
+    assert comp.run() == [-7] and comp.memory[3] == 2 and program[3] == 3
+    with pytest.raises(TypeError):
+        program[3] = 2
+    path.write_text('104,1,99')
+    os.utime(path, ns=(0, 0))
+    assert load_program(str(path)) == array('q', [104, 1, 99])
+
+
+def test_suspended():
+    # Counts down from its input like test_fused_instructions, then loops forever at 18.
+    program = [3, 100,
+               21101, 9, 0, 0, 1105, 1, 21,
+               4, 100,
+               1001, 100, -1, 100, 1005, 100, 2,
+               1105, 1, 18,
+               109, 2, 109, -2, 2106, 0, 0]
+    for engine in (Intcode, CompiledIntcode):
+        comp = engine(program)
+        # The values come after 7, 15 and 23 instructions; the compiled engine only stops between blocks.
+        assert comp.run([3], budget=16) == [3, 2]
+        assert comp.suspended
+        assert comp.run_until_output(budget=2) is Intcode.SUSPENDED
+        assert comp.run_until_output() == 1
+        assert comp.run_until_output(budget=1000) is Intcode.SUSPENDED
+        assert comp.run_until_outputs(2, budget=1000) == [] and comp.suspended
+        # A deadline stops a machine that would otherwise run forever.
+        start = time.monotonic()
+        assert comp.run_until_input_needed(deadline=start + 0.05) == []
+        assert comp.suspended and time.monotonic() - start < 1
+        assert comp.run_until_output(deadline=time.monotonic() - 1) is Intcode.SUSPENDED
+        comp.reset([3])
+        assert comp.run_until_outputs(3, deadline=time.monotonic() + 60) == [3, 2, 1]
+        assert comp.state == Intcode.RUNNING
+        # Running within both limits gives the same output as running without them.
+        comp = engine(program)
+        comp.append_input(2)
+        assert comp.run_until_outputs(2, budget=1000, deadline=time.monotonic() + 60) == [2, 1]
+        assert comp.state == Intcode.RUNNING
+    comp = Intcode(program, profile=True)
+    assert comp.run([2], budget=12) == [2] and comp.suspended and comp.instructions == 12
@@ -0,0 +1,85 @@
+"""
+Tests for the compiling Intcode computer.
+"""
+
+from intcode import Intcode, load_program
+from jit import CompiledIntcode
+
+
+def test_compiled_matches_interpreter():
+    for program, inp in [
+        ([1, 9, 10, 3, 2, 3, 11, 0, 99, 30, 40, 50], []),
+        ([1002, 4, 3, 4, 33], []),
+        ([103, 9, 103, 10, 2, 9, 10, 8, 0, 0, 0], [33, 3]),
+        ([3, 12, 6, 12, 15, 1, 13, 14, 13, 4, 13, 99, -1, 0, 1, 9], [-2]),
+        ([3, 21, 1008, 21, 8, 20, 1005, 20, 22, 107, 8, 21, 20, 1006, 20, 31,
+          1106, 0, 36, 98, 0, 0, 1002, 21, 125, 20, 4, 20, 1105, 1, 46, 104,
+          999, 1105, 1, 46, 1101, 1000, 1, 20, 4, 20, 1105, 1, 46, 98, 99], [57]),
+        ([109, 1, 204, -1, 1001, 100, 1, 100, 1008, 100, 16, 101, 1006, 101, 0, 99], []),
+        ([3, 0, 1001, 0, 1, 5000, 1001, 0, 2, 2000000, 4, 5000, 4, 2000000, 99], [10]),
+    ]:
+        expected, compiled = Intcode(program), CompiledIntcode(program)
+        assert compiled.run(inp) == expected.run(inp)
+        assert compiled.memory[:len(program) + 10] == expected.memory[:len(program) + 10]
+
+
+def test_compiled_self_modifying_code():
+    # The first instruction changes the operand of the second one, which is in the same block.
+    comp = CompiledIntcode([1101, 7, 0, 5, 104, 0, 99])
+    assert comp.run() == [7]
+    comp = CompiledIntcode([4, 20, 1001, 1, 1, 1, 1007, 1, 23, 19, 1005, 19, 0, 99, 0, 0, 0, 0, 0, 0, 10, 11, 12])
+    assert comp.run() == [10, 11, 12]
+    comp.memory[20] = 42
+    comp.reset()
+    assert comp.run() == [10, 11, 12]
+
+
+def play_breakout(engine) -> (int, Intcode):
+    """Play the day 13 game to the end, which keeps patching parameters of its own code."""
+    comp = engine(load_program('inputs/day13.txt'))
+    comp.memory[0] = 2
+    ball = paddle = score = 0
+    comp.input_fn = lambda: (ball > paddle) - (ball < paddle)
+    while (x := comp.run_until_output()) is not None:
+        y, tile = comp.run_until_output(), comp.run_until_output()
+        if (x, y) == (-1, 0):
+            score = tile
+        elif tile == 3:
+            paddle = x
+        elif tile == 4:
+            ball = x
+    return score, comp
+
+
+def test_compiled_breakout():
+    score, interpreted = play_breakout(Intcode)
+    assert score == 19297
+    score, compiled = play_breakout(CompiledIntcode)
+    assert score == 19297
+    assert compiled.instructions == interpreted.instructions
+    # The patched parameters are compiled as memory reads instead of recompiling their blocks on every patch,
+    # so the whole game needs fewer than 100 blocks. The speedup itself is measured by benchmark.py.
+    assert len(compiled._shared.functions) < 100
+
+
+def test_compiled_needs_input():
+    comp = CompiledIntcode([3, 20, 1005, 20, 6, 99, 4, 20, 1001, 20, -1, 20, 1005, 20, 6, 1105, 1, 0])
+    comp.append_input(3)
+    assert comp.run_until_input_needed() == [3, 2, 1]
+    assert comp.state == Intcode.NEEDS_INPUT
+    comp.append_input(0)
+    assert comp.run_until_input_needed() == []
+    assert comp.halted
+
+
+def test_compiled_read_patched_away():
+    # The program overwrites its own READ with an output instruction: only the block at 0 can tell.
+    comp = CompiledIntcode([3, 13, 1101, 104, 0, 0, 1101, 99, 0, 2, 1105, 1, 0, 0])
+    assert comp.run([5]) == [13]
+    assert comp.halted
+    program = [3, 10, 4, 10, 99, 0, 0, 0, 0, 0, 0]
+    assert CompiledIntcode(program).run([5]) == [5]
+    comp = CompiledIntcode(program)
+    comp.memory[0], comp.memory[1] = 104, 7
+    assert comp.run_until_input_needed() == [7, 0]
+    assert comp.halted
@@ -0,0 +1,71 @@
+"""
+Tests for networks of Intcode computers.
+"""
+
+import itertools
+import time
+
+from intcode import Intcode
+from network import Network
+
+# Reads X; halts if X >= 1000, otherwise outputs X + 1 and starts over.
+INCREMENT = [3, 100, 1007, 100, 1000, 101, 1006, 101, 18, 1001, 100, 1, 100, 4, 100, 1105, 1, 0, 99]
+
+
+def ring(size: int, network: Network = None) -> Network:
+    network = network or Network()
+    for i in range(size):
+        network.add(i, Intcode(INCREMENT))
+    for source, destination in itertools.pairwise(list(range(size)) + [0]):
+        network.connect(source, destination)
+    return network
+
+
+def test_ring():
+    network = ring(50)
+    network.send(0, 0)
+    # The machine receiving 1000 halts, and the rest wait for input forever.
+    assert network.run() == Network.DEADLOCK
+    assert network.last[49] == 1000 - 1000 % 50
+    assert [i for i, computer in network.computers.items() if computer.halted] == [0]
+
+
+def test_pipeline():
+    network = Network()
+    for name in 'AB':
+        network.add(name, Intcode([3, 9, 1002, 9, 2, 9, 4, 9, 99, 0]))
+    network.connect('A', 'B')
+    network.send('A', 21)
+    assert network.run() == Network.HALTED
+    assert network.last == {'A': 42, 'B': 84}
+
+
+def test_budget():
+    # A long-running machine gets its turn like the others, instead of holding up the network: the ring is done
+    # before it outputs, although it outputs first without a budget.
+    countdown = [1001, 20, -1, 20, 1005, 20, 0, 104, 1, 99] + [0] * 10 + [10_000]
+    for budget, order in [(10, [0, 1, 2, 'busy']), (None, ['busy', 0, 1, 2])]:
+        network = Network()
+        network.add('busy', Intcode(countdown))
+        ring(3, network)
+        network.send(0, 0)
+        assert network.run(budget=budget) == Network.DEADLOCK
+        assert list(network.last) == order
+        assert network.computers['busy'].halted
+    alone = ring(3)
+    alone.send(0, 0)
+    assert alone.run() == Network.DEADLOCK
+    assert network.last == alone.last | {'busy': 1}
+
+
+def test_deadline():
+    network = Network()
+    network.add('busy', Intcode([1105, 1, 0]))
+    start = time.monotonic()
+    assert network.run(deadline=start + 0.05) == Network.SUSPENDED
+    assert network.computers['busy'].suspended
+    # The clock is only read between slices, but the run does not go on for long after the deadline.
+    assert time.monotonic() - start < 5
+    instructions = network.computers['busy'].instructions
+    assert network.run(budget=100, deadline=time.monotonic() + 0.05) == Network.SUSPENDED
+    assert network.computers['busy'].instructions > instructions
@@ -0,0 +1,60 @@
+"""
+Tests for running Intcode computers in parallel.
+"""
+
+import itertools
+from functools import partial
+
+from intcode import Intcode
+from parallel import chunked, sweep
+
+# Stores mem[mem[1]] * mem[mem[2]] + mem[mem[5]] at 0.
+PROGRAM = [2, 0, 0, 0, 1, 0, 0, 0, 99] + list(range(9, 40))
+
+
+def zero_is(target, comp: Intcode) -> bool:
+    return comp.memory[0] == target
+
+
+def test_chunked():
+    assert list(chunked(range(7), 3)) == [[0, 1, 2], [3, 4, 5], [6]]
+    assert list(chunked([], 3)) == []
+
+
+def test_sweep():
+    overrides = {1: range(9, 40), 2: range(9, 40), 5: range(9, 12)}
+    expected = None
+    for values in itertools.product(*overrides.values()):
+        comp = Intcode(PROGRAM)
+        for address, value in zip(overrides, values):
+            comp.memory[address] = value
+        comp.run_until_input_needed()
+        if comp.memory[0] == 1000:
+            expected = dict(zip(overrides, values))
+            break
+    assert expected is not None
+    for workers in (1, 3):
+        assert sweep(PROGRAM, overrides, partial(zero_is, 1000), workers=workers, chunk_size=16) == expected
+        assert sweep(PROGRAM, overrides, partial(zero_is, -1), workers=workers, chunk_size=16) is None
+
+
+def halted(comp: Intcode) -> bool:
+    return comp.halted
+
+
+def test_sweep_budget():
+    # Jumps to the address at 2: 0 loops forever, 3 halts.
+    program = [1105, 1, 0, 99]
+    for workers in (1, 2):
+        assert sweep(program, {2: [0, 0, 3]}, halted, workers=workers, budget=100) == {2: 3}
+
+
+def halted_with(value, comp: Intcode) -> bool:
+    return comp.halted and comp.memory[5] == value
+
+
+def test_sweep_input_iterator():
+    # Reads into 0 and halts; every combination needs the input, not just the first one.
+    for workers in (1, 2):
+        inp = (x for x in [7])
+        assert sweep([3, 0, 99, 0, 0, 0], {5: [0, 1, 2]}, partial(halted_with, 2), inp=inp, workers=workers) == {5: 2}
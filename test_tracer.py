@@ -0,0 +1,61 @@
+"""
+Tests for Intcode instruction traces.
+"""
+
+import pytest
+
+from intcode import Intcode
+from tracer import Record, Tracer, read_trace
+
+
+def test_trace():
+    # Reads a number N, then outputs N, N-1, ..., 1 and asks for the next number; 0 halts.
+    program = [3, 20, 1005, 20, 6, 99, 4, 20, 1001, 20, -1, 20, 1005, 20, 6, 1105, 1, 0]
+    comp = Intcode(program, tracer=Tracer(capacity=4))
+    comp.append_input(2)
+    assert comp.run_until_output() == 2
+    assert comp.tracer.last() == [
+        Record(pos=0, instruction=3, p1=20, p2=1005, p3=20, address=20, value=2),
+        Record(pos=2, instruction=1005, p1=20, p2=6, p3=99, address=-1, value=-1),
+        Record(pos=6, instruction=4, p1=20, p2=1001, p3=20, address=-1, value=2),
+    ]
+    assert comp.run_until_input_needed() == [1]
+    # Only the last 4 records are kept, and the READ waiting for input is not one of them.
+    assert comp.tracer.count == 9
+    assert [record.pos for record in comp.tracer.last()] == [6, 8, 12, 15]
+    assert comp.tracer.last(1) == [Record(pos=15, instruction=1105, p1=1, p2=0, p3=0, address=-1, value=-1)]
+    assert comp.tracer.last(3)[0] == Record(pos=8, instruction=1001, p1=20, p2=-1, p3=20, address=20, value=0)
+
+
+def test_fork_traced():
+    program = [3, 20, 1005, 20, 6, 99, 4, 20, 1001, 20, -1, 20, 1005, 20, 6, 1105, 1, 0]
+    comp = Intcode(program, tracer=Tracer(capacity=4))
+    clone = comp.fork()
+    clone.append_input(1)
+    assert clone.run_until_input_needed() == [1]
+    assert comp.pos == 0 and comp.tracer.count == 6
+    comp.append_input(2)
+    assert comp.run_until_input_needed() == [2, 1]
+    assert comp.tracer.count == 6 + 9
+
+
+def test_trace_file(tmp_path):
+    path = str(tmp_path / 'trace')
+    # Adds its inputs, printing the running sum after each one.
+    program = [3, 100, 1, 100, 101, 101, 4, 101, 1105, 1, 0]
+    comp = Intcode(program, tracer=Tracer(capacity=3, path=path))
+    comp.feed(range(1, 11))
+    assert comp.run_until_input_needed()[-1] == 55
+    comp.tracer.close()
+    records = list(read_trace(path, chunk=2))
+    assert len(records) == 40 == comp.tracer.count
+    assert [r.pos for r in records[:5]] == [0, 2, 6, 8, 0]
+    assert [r.value for r in records if r.instruction == 4] == [sum(range(1, n + 1)) for n in range(1, 11)]
+
+
+def test_trace_on_error(tmp_path):
+    path = str(tmp_path / 'trace')
+    comp = Intcode([1101, 0, 42, 4, 0, 99], tracer=Tracer(path=path))
+    with pytest.raises(ValueError, match='Unexpected code 42 at position 4'):
+        comp.run()
+    assert list(read_trace(path)) == [Record(0, 1101, 0, 42, 4, 4, 42)]
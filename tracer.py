@@ -0,0 +1,87 @@
+"""
+Instruction traces of Intcode computers.
+
+A Tracer keeps the last executed instructions in a ring buffer of 64-bit integers, and can write all of them
+to a binary file: a header followed by records of RECORD_SIZE packed integers in the machine's byte order.
+READ_TRACE decodes such a file lazily, so that long traces can be searched without loading them.
+"""
+
+from array import array
+from collections import namedtuple
+from typing import Iterator, Optional
+
+MAGIC = b'ICTRACE1'
+
+# One executed instruction: its position, the instruction itself and the three cells after it, and the address
+# written to and the value written there. For WRITE, VALUE is the output and ADDRESS is -1; for instructions
+# that write nothing, both are -1.
+Record = namedtuple('Record', 'pos instruction p1 p2 p3 address value')
+RECORD_SIZE = len(Record._fields)
+
+
+class Tracer:
+    """Ring buffer holding the last CAPACITY records. If PATH is given, every record is written there as well,
+    a buffer at a time: call FLUSH or CLOSE to write out the records that did not fill a buffer yet."""
+
+    def __init__(self, capacity: int = 1 << 16, path: Optional[str] = None):
+        self.capacity = capacity
+        self.buffer = array('q', bytes(8 * RECORD_SIZE * capacity))
+        # Number of records ever added, and how many of them are in the file.
+        self.count = 0
+        self.flushed = 0
+        self.file = None
+        if path is not None:
+            self.file = open(path, 'wb')
+            self.file.write(MAGIC)
+
+    def add(self, pos, instruction, p1, p2, p3, address, value):
+        buffer, i = self.buffer, self.count % self.capacity * RECORD_SIZE
+        buffer[i] = pos
+        buffer[i + 1] = instruction
+        buffer[i + 2] = p1
+        buffer[i + 3] = p2
+        buffer[i + 4] = p3
+        buffer[i + 5] = address
+        buffer[i + 6] = value
+        self.count += 1
+        if self.file is not None and self.count - self.flushed == self.capacity:
+            self.flush()
+
+    def flush(self):
+        """Write the records added since the last flush to the file."""
+        if self.file is None:
+            return
+        start, end = self.flushed % self.capacity, self.count % self.capacity
+        if self.count - self.flushed == self.capacity:
+            self.buffer[start * RECORD_SIZE:].tofile(self.file)
+            self.buffer[:start * RECORD_SIZE].tofile(self.file)
+        elif start <= end:
+            self.buffer[start * RECORD_SIZE:end * RECORD_SIZE].tofile(self.file)
+        else:
+            self.buffer[start * RECORD_SIZE:].tofile(self.file)
+            self.buffer[:end * RECORD_SIZE].tofile(self.file)
+        self.file.flush()
+        self.flushed = self.count
+
+    def close(self):
+        if self.file is not None:
+            self.flush()
+            self.file.close()
+            self.file = None
+
+    def last(self, n: Optional[int] = None) -> list:
+        """Return the last N records still in the buffer (all of them by default), oldest first."""
+        n = min(self.count, self.capacity, self.count if n is None else n)
+        starts = (i % self.capacity * RECORD_SIZE for i in range(self.count - n, self.count))
+        return [Record(*self.buffer[start:start + RECORD_SIZE]) for start in starts]
+
+
+def read_trace(path: str, chunk: int = 4096) -> Iterator[Record]:
+    """Yield the records of the trace file at PATH, reading CHUNK records at a time."""
+    with open(path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f'{path} is not an Intcode trace')
+        while data := f.read(8 * RECORD_SIZE * chunk):
+            values = array('q', data)
+            for i in range(0, len(values), RECORD_SIZE):
+                yield Record(*values[i:i + RECORD_SIZE])